@@ -0,0 +1,161 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from sqlite_store import SQLiteStore
+
+# Two-level cache in front of answer_question:
+#   1. exact   - normalized question text -> answer (no embedding needed)
+#   2. similar - cosine similarity of the query embedding (the one already computed for retrieval)
+#                against cached questions, hit when >= threshold
+# Entries are evicted least-recently-used beyond max_entries and expire after ttl_seconds.
+# Lookups are served from memory; each put or hit is persisted as single-row SQLite writes made after the
+# lock is released, so saving never rewrites the whole cache or blocks other sessions' lookups.
+
+def normalize_question(question):
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+class AnswerCache(SQLiteStore):
+    def __init__(self, path, max_entries=500, ttl_seconds=7 * 24 * 3600, threshold=0.92):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._matrix = None
+        self._keys = []
+        self._load()
+
+    # ---- Persistence ----
+    def _load(self):
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, answer TEXT NOT NULL, sources TEXT NOT NULL, vector BLOB, "
+            "created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        # Least recently used first, so the OrderedDict ends up in LRU order
+        for key, answer, sources, vector, created in conn.execute(
+            "SELECT key, answer, sources, vector, created FROM answers ORDER BY used"
+        ):
+            self.entries[key] = {
+                "key": key,
+                "answer": answer,
+                "sources": json.loads(sources),
+                "vector": np.frombuffer(vector, dtype=np.float32) if vector is not None else None,
+                "created": created
+            }
+        self._delete(self._expire())
+
+    def _delete(self, keys):
+        if keys:
+            self._conn().executemany("DELETE FROM answers WHERE key = ?", [(k,) for k in keys])
+
+    def _touch(self, key):
+        self._conn().execute("UPDATE answers SET used = ? WHERE key = ?", (time.time(), key))
+
+    # ---- Eviction ----
+    def _expire(self):
+        # Returns the evicted keys, for the caller to delete from the database once it has released the lock
+        cutoff = time.time() - self.ttl_seconds
+        evicted = [k for k, e in self.entries.items() if e["created"] < cutoff]
+        for k in evicted:
+            del self.entries[k]
+        while len(self.entries) > self.max_entries:
+            evicted.append(self.entries.popitem(last=False)[0])
+        self._matrix = None
+        return evicted
+
+    def _hit(self, key):
+        entry = self.entries[key]
+        if entry["created"] < time.time() - self.ttl_seconds:
+            del self.entries[key]
+            self._matrix = None
+            return None
+        self.entries.move_to_end(key)
+        return entry["answer"], entry["sources"]
+
+    # ---- Lookups ----
+    def get_exact(self, question):
+        key = normalize_question(question)
+        with self.lock:
+            if key not in self.entries:
+                return None
+            result = self._hit(key)
+            if result is not None:
+                self.exact_hits += 1
+        self._persist_hit(key, result)
+        return result
+
+    def _persist_hit(self, key, result):
+        # A found entry is either refreshed in the LRU order or, if it turned out to be expired, deleted
+        if result is not None:
+            self._touch(key)
+        else:
+            self._delete([key])
+
+    def get_similar(self, query_vector):
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        key, result = None, None
+        with self.lock:
+            if self._matrix is None:
+                # Answers served by the lexical fast path have no query vector and are only exact-matchable
+                self._keys = [k for k, e in self.entries.items() if e["vector"] is not None]
+                self._matrix = np.asarray([self.entries[k]["vector"] for k in self._keys], dtype=np.float32)
+            if self._keys:
+                scores = self._matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = self._keys[best]
+                    result = self._hit(key)
+            if result is not None:
+                self.similar_hits += 1
+            else:
+                self.misses += 1
+        if key is not None:
+            self._persist_hit(key, result)
+        return result
+
+    def record_miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def put(self, question, query_vector, answer, sources):
+        vector = None
+        if query_vector is not None:
+            vector = np.asarray(query_vector, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        key = normalize_question(question)
+        entry = {
+            "key": key,
+            "answer": answer,
+            "sources": list(sources),
+            "vector": vector,
+            "created": time.time()
+        }
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            evicted = self._expire()
+        with self.write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, sources, vector, created, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, answer, json.dumps(entry["sources"]), vector.tobytes() if vector is not None else None,
+                 entry["created"], entry["created"])
+            )
+            conn.executemany("DELETE FROM answers WHERE key = ?", [(k,) for k in evicted])
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,79 @@
+# Throughput of the shared Granite pipeline at 1, 4 and 16 concurrent askers:
+# "serial" is the current behaviour (sessions take turns on one pipeline),
+# "batched" routes the same prompts through GenerationScheduler.
+#   python bench_generation_scheduler.py --max-new-tokens 64
+import argparse
+import statistics
+import threading
+import time
+import granite_llm
+from generation_scheduler import GenerationScheduler
+
+QUESTIONS = [
+    "What is a SIP and how does it work?",
+    "How can I save more each month?",
+    "What is the ELSS tax deduction limit?",
+    "How do I improve my credit score?",
+    "Should I pay off debt or invest first?",
+    "What is an emergency fund?",
+    "How does compound interest work?",
+    "What is the difference between a mutual fund and an ETF?",
+]
+
+def run(concurrency, requests_per_asker, ask):
+    latencies = []
+    lock = threading.Lock()
+
+    def asker(n):
+        for i in range(requests_per_asker):
+            prompt = f"Question: {QUESTIONS[(n + i) % len(QUESTIONS)]}\nAnswer:"
+            start = time.perf_counter()
+            ask(prompt)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=asker, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, statistics.median(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched Granite generation.")
+    parser.add_argument("--model", default="ibm-granite/granite-3.3-2b-instruct")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests-per-asker", type=int, default=2)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    granite_pipe = granite_llm.load_pipeline(args.model)
+    pipe_lock = threading.Lock()
+
+    def serial(prompt):
+        with pipe_lock:
+            return granite_llm.generate_batch(granite_pipe, [prompt], args.max_new_tokens)[0]
+
+    scheduler = GenerationScheduler(
+        lambda prompts: granite_llm.generate_batch(granite_pipe, prompts, args.max_new_tokens),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    )
+
+    serial("Question: warm-up\nAnswer:")
+    print(f"{'askers':>6} | {'mode':>7} | {'req/s':>7} | {'p50 latency s':>13} | mean batch")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        rps, p50 = run(concurrency, args.requests_per_asker, serial)
+        print(f"{concurrency:>6} | {'serial':>7} | {rps:7.3f} | {p50:13.2f} |          1")
+        before = scheduler.stats()
+        rps, p50 = run(concurrency, args.requests_per_asker, scheduler.generate)
+        after = scheduler.stats()
+        mean_batch = (after["requests"] - before["requests"]) / max(after["batches"] - before["batches"], 1)
+        print(f"{concurrency:>6} | {'batched':>7} | {rps:7.3f} | {p50:13.2f} | {mean_batch:10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Compares CPU backends for Granite against the float32 baseline on a fixed set of finance questions:
+# load time, resident memory, generation speed and how closely each backend's answers match fp32.
+# Each backend runs in its own process so resident memory is measured in isolation.
+#   python bench_llm_backends.py --backends fp32,bf16,int8
+import argparse
+import difflib
+import multiprocessing as mp
+import time
+
+QUESTIONS = [
+    "What is a systematic investment plan (SIP)?",
+    "How much of my salary should go into an emergency fund?",
+    "What is the difference between a fixed deposit and a debt mutual fund?",
+    "How does the 50/30/20 budgeting rule work?",
+    "What is an ELSS fund and how does it save tax?",
+    "Should I prepay my home loan or invest the money?",
+]
+
+def rss_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+def run_backend(model_name, backend, max_new_tokens, results):
+    import torch
+    import granite_llm
+
+    start = time.perf_counter()
+    model, tokenizer = granite_llm.load_model(model_name, backend)
+    load_s = time.perf_counter() - start
+
+    answers, new_tokens, gen_s = [], 0, 0.0
+    for question in QUESTIONS:
+        inputs = tokenizer(f"Question: {question}\nAnswer:", return_tensors="pt")
+        start = time.perf_counter()
+        with torch.no_grad():
+            output = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+        gen_s += time.perf_counter() - start
+        generated = output[0, inputs["input_ids"].shape[1]:]
+        new_tokens += len(generated)
+        answers.append(tokenizer.decode(generated, skip_special_tokens=True).strip())
+
+    results[backend] = {
+        "load_s": load_s,
+        "rss_mb": rss_mb(),
+        "tokens_per_s": new_tokens / gen_s if gen_s else 0.0,
+        "answers": answers
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quantized Granite CPU backends with float32.")
+    parser.add_argument("--model", default="ibm-granite/granite-3.3-2b-instruct")
+    parser.add_argument("--backends", default="fp32,bf16,int8")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    if "fp32" not in backends:
+        backends.insert(0, "fp32")
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Manager().dict()
+    for backend in backends:
+        proc = ctx.Process(target=run_backend, args=(args.model, backend, args.max_new_tokens, results))
+        proc.start()
+        proc.join()
+        if backend not in results:
+            print(f"{backend}: failed (exit code {proc.exitcode})")
+
+    baseline = results.get("fp32")
+    print(f"{'backend':>7} | {'load s':>6} | {'RSS MB':>7} | {'tok/s':>6} | exact match | similarity")
+    for backend in backends:
+        if backend not in results:
+            continue
+        r = results[backend]
+        exact = similarity = float("nan")
+        if baseline is not None:
+            pairs = list(zip(baseline["answers"], r["answers"]))
+            exact = sum(a == b for a, b in pairs) / len(pairs)
+            similarity = sum(difflib.SequenceMatcher(None, a, b).ratio() for a, b in pairs) / len(pairs)
+        print(f"{backend:>7} | {r['load_s']:6.1f} | {r['rss_mb']:7.0f} | {r['tokens_per_s']:6.2f} | "
+              f"{exact:11.2f} | {similarity:10.2f}")
+
+if __name__ == "__main__":
+    main()
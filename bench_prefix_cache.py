@@ -0,0 +1,46 @@
+# Prefill time per query with and without the cached prompt preamble.
+# Past answers from the search history (search_history.sqlite) stand in for retrieved context so prompt lengths are realistic.
+#   python bench_prefix_cache.py
+import argparse
+import os
+from itertools import islice
+import granite_llm
+from history_store import HistoryStore
+
+def sample_prompts(history_file, n):
+    rows = []
+    if os.path.exists(history_file):
+        rows = [(entry["question"], entry["answer"]) for entry in islice(HistoryStore(history_file).since(0), n)]
+    rows = rows or [("What is a SIP?", "A SIP is a systematic investment plan.")]
+    return [
+        granite_llm.PROMPT_PREAMBLE + f"{answer[:1000]}\n\nQuestion: {question}\nAnswer:"
+        for question, answer in rows
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prefill time saved by the prefix KV cache.")
+    parser.add_argument("--model", default="ibm-granite/granite-3.3-2b-instruct")
+    parser.add_argument("--history", default="search_history.sqlite")
+    parser.add_argument("--prompts", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    granite_pipe = granite_llm.load_pipeline(args.model)
+    prefix_cache = granite_llm.PrefixCache(granite_pipe)
+    prompts = sample_prompts(args.history, args.prompts)
+
+    # Equal outputs confirm the cached path generates exactly what the full prompt would
+    same = sum(
+        granite_llm.generate_answer(granite_pipe, p) == granite_llm.generate_answer(granite_pipe, p, prefix_cache)
+        for p in prompts[:2]
+    )
+    result = granite_llm.measure_prefill(granite_pipe, prefix_cache, prompts, args.repeats)
+    print(f"prefix tokens:        {result['prefix_tokens']}")
+    print(f"full prefill:         {result['full_prefill_ms']:.1f} ms/query")
+    print(f"with cached preamble: {result['cached_prefill_ms']:.1f} ms/query")
+    print(f"saved:                {result['saved_ms']:.1f} ms/query "
+          f"({100 * result['saved_ms'] / result['full_prefill_ms']:.1f}%)")
+    print(f"identical answers:    {same}/{min(2, len(prompts))}")
+
+if __name__ == "__main__":
+    main()
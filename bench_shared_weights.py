@@ -0,0 +1,76 @@
+# Per-process memory of 1, 2 and 4 Granite replicas on one host, private copies vs memory-mapped shared weights.
+# Every replica loads the model, answers one question and then waits until all replicas are up, so the numbers
+# are taken while they coexist. From /proc/self/smaps_rollup:
+#   RSS      resident pages mapped by the process (shared pages counted in full by every replica)
+#   PSS      RSS with each shared page divided among the processes mapping it; sum(PSS) = real host usage
+#   shared   Shared_Clean + Shared_Dirty, private = Private_Clean + Private_Dirty
+#   python bench_shared_weights.py --replicas 1,2,4 --backend bf16
+import argparse
+import multiprocessing as mp
+
+FIELDS = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+          "Private_Clean": "private", "Private_Dirty": "private"}
+
+def memory_mb():
+    usage = dict.fromkeys(set(FIELDS.values()), 0.0)
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            key = line.split(":")[0]
+            if key in FIELDS:
+                usage[FIELDS[key]] += int(line.split()[1]) / 1024
+    return usage
+
+def replica(rank, model_name, backend, shared_dir, all_loaded, measured, results):
+    import torch
+    import granite_llm
+    model, tokenizer = granite_llm.load_model(model_name, backend, shared_dir)
+    inputs = tokenizer("Question: What is a SIP?\nAnswer:", return_tensors="pt")
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=8, do_sample=False)
+    all_loaded.wait()
+    results[rank] = memory_mb()
+    measured.wait()
+
+def run(n, mode, args):
+    ctx = mp.get_context("spawn")
+    all_loaded, measured = ctx.Barrier(n), ctx.Barrier(n)
+    results = ctx.Manager().dict()
+    shared_dir = args.shared_dir if mode == "mmap" else None
+    procs = [
+        ctx.Process(target=replica, args=(rank, args.model, args.backend, shared_dir, all_loaded, measured, results))
+        for rank in range(n)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return [results[rank] for rank in range(n) if rank in results]
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-replica RSS vs shared memory for Granite weights.")
+    parser.add_argument("--model", default="ibm-granite/granite-3.3-2b-instruct")
+    parser.add_argument("--backend", default="bf16", choices=["fp32", "bf16"])
+    parser.add_argument("--replicas", default="1,2,4")
+    parser.add_argument("--modes", default="private,mmap")
+    parser.add_argument("--shared-dir", default="granite_shared")
+    args = parser.parse_args()
+
+    # Export once up front so no replica's measurement includes the conversion
+    import granite_llm
+    weights_dir = granite_llm.shared_weights_path(args.shared_dir, args.model, args.backend)
+    granite_llm.export_shared_weights(args.model, weights_dir, args.backend)
+
+    print(f"{'mode':>7} | {'replicas':>8} | {'RSS MB':>7} | {'PSS MB':>7} | {'shared MB':>9} | "
+          f"{'private MB':>10} | host total (sum PSS) MB")
+    for mode in args.modes.split(","):
+        for n in [int(r) for r in args.replicas.split(",")]:
+            usage = run(n, mode, args)
+            if len(usage) < n:
+                print(f"{mode:>7} | {n:>8} | failed ({len(usage)} of {n} replicas reported)")
+                continue
+            mean = {k: sum(u[k] for u in usage) / n for k in usage[0]}
+            print(f"{mode:>7} | {n:>8} | {mean['rss']:7.0f} | {mean['pss']:7.0f} | {mean['shared']:9.0f} | "
+                  f"{mean['private']:10.0f} | {sum(u['pss'] for u in usage):.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Assisted (speculative) decoding vs plain greedy Granite generation, per answer:
+# checks the outputs are identical and reports draft acceptance rate and end-to-end speedup.
+#   python bench_speculative.py --draft ibm-granite/granite-3.0-1b-a400m-instruct
+import argparse
+import time
+import granite_llm
+
+QUESTIONS = [
+    "What is a systematic investment plan (SIP)?",
+    "How can I save more each month?",
+    "What is the ELSS tax deduction limit in India?",
+    "How do I create a monthly budget?",
+    "What are the benefits of an emergency fund?",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assisted generation with a draft model.")
+    parser.add_argument("--model", default="ibm-granite/granite-3.3-2b-instruct")
+    parser.add_argument("--draft", default="ibm-granite/granite-3.0-1b-a400m-instruct")
+    parser.add_argument("--backend", default="fp32")
+    args = parser.parse_args()
+
+    granite_pipe = granite_llm.load_pipeline(args.model, args.backend)
+    draft = granite_llm.DraftModel(args.draft, granite_pipe.model)
+    granite_llm.generate_answer(granite_pipe, "Question: warm-up\nAnswer:", draft=draft)
+
+    total_plain = total_assisted = 0.0
+    print(f"{'#':>2} | identical | accept | tok/step | plain s | assisted s | speedup")
+    for i, question in enumerate(QUESTIONS, 1):
+        prompt = f"Question: {question}\nAnswer:"
+        start = time.perf_counter()
+        plain = granite_llm.generate_answer(granite_pipe, prompt)
+        plain_s = time.perf_counter() - start
+        spec = {}
+        start = time.perf_counter()
+        assisted = granite_llm.generate_answer(granite_pipe, prompt, draft=draft, stats=spec)
+        assisted_s = time.perf_counter() - start
+        total_plain += plain_s
+        total_assisted += assisted_s
+        print(f"{i:>2} | {str(plain == assisted):>9} | {spec['acceptance_rate']:6.2f} | "
+              f"{spec['tokens_per_step']:8.2f} | {plain_s:7.1f} | {assisted_s:10.1f} | {plain_s / assisted_s:6.2f}x")
+    print(f"overall speedup: {total_plain / total_assisted:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Insights prompt on synthetic histories of 100k-1M transactions: the old prompt (every transaction pasted in)
+# vs the local statistical summary, computed either from raw transactions or from the month x category
+# rollups the transaction store maintains (what the Spending Insights page uses).
+#   python bench_spending_trends.py --sizes 100000,300000,1000000
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+import spending_trends
+
+CATEGORIES = ["Food", "Travel", "Entertainment", "Bills", "Shopping", "Medical", "Education",
+              "Investments", "Insurance", "Savings", "Rent"]
+CONTEXT_WINDOW_TOKENS = 1_048_576  # gemini-2.0-flash input limit
+
+def synthetic_transactions(n, months=36, spikes=10, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2022-01-01")
+    days = rng.integers(0, months * 30, n)
+    category = rng.integers(0, len(CATEGORIES), n)
+    scale = np.linspace(200, 3000, len(CATEGORIES))[category]
+    amount = rng.lognormal(np.log(scale), 0.5).round(2)
+    # A few category-months get an extra burst of large purchases
+    for _ in range(spikes):
+        month, cat = rng.integers(0, months), rng.integers(0, len(CATEGORIES))
+        hit = (days // 30 == month) & (category == cat)
+        amount[hit] *= 4
+    return pd.DataFrame({
+        "date": start + days.astype("timedelta64[D]"),
+        "category": pd.Categorical.from_codes(category, categories=CATEGORIES),
+        "amount": amount
+    })
+
+def rollups_of(transactions):
+    # What TransactionStore.rollups() returns for this history
+    month = transactions["date"].dt.to_period("M").astype(str).rename("month")
+    grouped = transactions.groupby([month, "category"], observed=True)["amount"]
+    return grouped.agg(total="sum", count="count", min_amount="min", max_amount="max").reset_index()
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local spending trend summaries vs full-history prompts.")
+    parser.add_argument("--sizes", default="100000,300000,1000000")
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'transactions':>12} | {'old prompt chars':>16} | {'~tokens':>9} | {'fits':>4} | {'old build s':>11} | "
+          f"{'from rows s':>11} | {'from rollups s':>14} | {'new prompt chars':>16} | spikes found")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        transactions = synthetic_transactions(n, args.months)
+        rollups = rollups_of(transactions)
+
+        old_prompt, old_s = timed(
+            lambda: str(transactions.astype({"date": str, "category": str}).to_dict(orient="records")), 1
+        )
+        summary, rows_s = timed(
+            lambda: spending_trends.summarize(spending_trends.monthly_from_transactions(transactions)), args.repeats
+        )
+        summary_rollups, rollups_s = timed(
+            lambda: spending_trends.summarize(spending_trends.monthly_from_rollups(rollups)), args.repeats
+        )
+        assert json.dumps(summary) == json.dumps(summary_rollups)
+        tokens = len(old_prompt) // 4
+        print(f"{n:>12} | {len(old_prompt):>16,} | {tokens:>9,} | {'yes' if tokens < CONTEXT_WINDOW_TOKENS else 'no':>4} | "
+              f"{old_s:>11.2f} | {rows_s:>11.3f} | {rollups_s:>14.4f} | {len(json.dumps(summary)):>16,} | "
+              f"{len(summary['spikes'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Home-page cold start: import cost of main.py before (every page module imported eagerly) and after
+# (page modules imported on first request). Each sample runs in a fresh interpreter so nothing is cached
+# in sys.modules; the OS page cache is warmed by one discarded run first.
+#   python bench_startup_imports.py --repeats 5
+# --apptest additionally renders the home page end to end with streamlit.testing (streamlit >= 1.28).
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+EAGER = ["streamlit", "budget_summaries", "spending_insights", "NLU_Analysis", "rag_granite_finance", "about_fibot"]
+LAZY = ["streamlit", "startup_timeline"]
+HEAVY = ["torch", "transformers", "langchain", "datasets", "faiss", "reportlab", "matplotlib", "google.generativeai"]
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": len(sys.modules),
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+APPTEST = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("main.py", default_timeout=600).run()
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+def run(code):
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def sample(code, repeats):
+    run(code)
+    runs = [run(code) for _ in range(repeats)]
+    return statistics.median(r["seconds"] for r in runs), runs[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark home-page import time with eager vs lazy page imports.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--apptest", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'home page':>9} | {'import s':>8} | {'modules':>7} | heavy packages loaded")
+    for label, modules in (("before", EAGER), ("after", LAZY)):
+        seconds, last = sample(PROBE.format(modules=modules, heavy=HEAVY), args.repeats)
+        print(f"{label:>9} | {seconds:8.2f} | {last['modules']:7d} | {', '.join(last['heavy']) or '-'}")
+
+    if args.apptest:
+        seconds, _ = sample(APPTEST, args.repeats)
+        print(f"home page rendered by AppTest (current main.py): {seconds:.2f} s median")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Maps spending categories to the 50/30/20-style budget classes and computes the budget summary locally.
+#   1. the fixed categories offered by Spending Insights are looked up in CATEGORY_CLASSES
+#   2. custom categories are sent to the LLM fallback once, in one batch, and the answer is cached on disk
+# Only the advice paragraph still needs Gemini; totals, limits and ok/exceeded status are plain arithmetic.
+
+CLASSES = ("needs", "wants", "savings", "investments")
+DEFAULT_CLASS = "wants"  # unknown spending is treated as discretionary until classified
+
+CATEGORY_CLASSES = {
+    "food": "needs",
+    "bills": "needs",
+    "medical": "needs",
+    "education": "needs",
+    "insurance": "needs",
+    "travel": "wants",
+    "entertainment": "wants",
+    "shopping": "wants",
+    "savings": "savings",
+    "investments": "investments",
+}
+
+def known_class(category):
+    return CATEGORY_CLASSES.get(category.strip().lower())
+
+class CategoryClassifier:
+    def __init__(self, path="category_classes.json"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.learned = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.learned = {k: v for k, v in json.load(f).items() if v in CLASSES}
+            except (OSError, ValueError):
+                self.learned = {}
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.learned, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def classify(self, categories, fallback=None):
+        # fallback(list of category names) -> {name: class}; called only for categories neither table covers
+        classes, unknown = {}, []
+        for category in categories:
+            cls = known_class(category)
+            if cls is None:
+                with self.lock:
+                    cls = self.learned.get(category.strip().lower())
+            if cls is None:
+                unknown.append(category)
+            else:
+                classes[category] = cls
+        if unknown and fallback is not None:
+            try:
+                answer = fallback(unknown)
+            except Exception:
+                logger.exception("Category classification fallback failed for %s", unknown)
+                answer = {}
+            learned = {c: answer.get(c) for c in unknown if answer.get(c) in CLASSES}
+            if learned:
+                with self.lock:
+                    self.learned.update({c.strip().lower(): cls for c, cls in learned.items()})
+                    self._save()
+            classes.update(learned)
+        for category in unknown:
+            classes.setdefault(category, DEFAULT_CLASS)
+        return classes
+
+def budget_summary(category_totals, classes, total_budget, allocation_percentages):
+    spent = dict.fromkeys(CLASSES, 0.0)
+    for category, amount in category_totals.items():
+        spent[classes.get(category, DEFAULT_CLASS)] += float(amount)
+    summary = {}
+    for cls in CLASSES:
+        limit = total_budget * allocation_percentages[cls] / 100
+        summary[cls] = {
+            "spent": round(spent[cls], 2),
+            "limit": round(limit, 2),
+            "status": "exceeded" if spent[cls] > limit else "ok"
+        }
+    return summary
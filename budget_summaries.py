@@ -12,6 +12,50 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from textwrap import wrap
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+import budget_classifier
+from transaction_store import TransactionStore
+
+ADVICE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="budget-advice")
+
+@st.cache_resource
+def load_transaction_store():
+    return TransactionStore()
+
+@st.cache_resource
+def load_category_classifier():
+    return budget_classifier.CategoryClassifier()
+
+def parse_json(raw_text):
+    # Extract JSON in case model adds extra text
+    json_match = re.search(r"\{[\s\S]*\}", raw_text)
+    if json_match:
+        raw_text = json_match.group()
+    return json.loads(raw_text)
+
+def gemini_classify(model, categories):
+    # Only reached for custom categories outside the known table; answers are cached by the classifier
+    prompt = f"""
+    Classify each personal spending category into exactly one of: needs, wants, savings, investments.
+    Return **valid JSON only**: an object mapping each category name, exactly as given, to its class.
+    Categories: {json.dumps(categories)}
+    """
+    return parse_json(model.generate_content(prompt).text.strip())
+
+def fetch_advice(model, summary, category_totals, classes, total_budget, allocation_percentages):
+    prompt = f"""
+    You are a financial advisor AI.
+    The user's spending has already been categorized and compared with their budget allocation:
+    Budget Summary: {json.dumps(summary)}
+    Spending by Category (₹): {json.dumps(category_totals)}
+    Category Classes: {json.dumps(classes)}
+    Total Monthly Budget: {total_budget}
+    Allocation Percentages: {allocation_percentages}
+
+    Write full paragraph(s) of budget optimization advice for the user. Return only the advice text.
+    """
+    return model.generate_content(prompt).text.strip()
+
 def main():
     # --- CONFIG ---
     st.set_page_config(page_title="💰 Budget Summary", page_icon="💰", layout="wide")
@@ -22,19 +66,19 @@ def main():
     model = genai.GenerativeModel("gemini-2.0-flash")
 
     # --- Load Spending Data ---
-    HISTORY_FILE = "transactions_history.csv"
-    if not os.path.exists(HISTORY_FILE):
+    store = load_transaction_store()
+    months = store.months()
+    if not months:
         st.error("No transaction history found. Please add transactions in Spending Insights first.")
         st.stop()
 
-    history_df = pd.read_csv(HISTORY_FILE)
-
     # --- UI ---
     st.title("💰 Budget Summaries & AI Suggestions")
     st.markdown("This page analyzes your past spending and suggests ways to optimize your budget.")
 
     # --- User Budget Inputs ---
     total_budget = st.number_input("Enter your total monthly budget (₹)", min_value=1000, step=500)
+    start_month, end_month = st.select_slider("Spending period", options=months, value=(months[0], months[-1]))
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -56,48 +100,27 @@ def main():
         st.session_state.percentages = None
     if "parsed_data" not in st.session_state:
         st.session_state.parsed_data = None
+    get_advice = st.checkbox("💡 Include Fibot AI advice", value=True)
 
     # --- Generate Analysis ---
     if st.button("📊 Analyze Budget & Get Suggestions", use_container_width=True):
-        category_totals = history_df.groupby("category")["amount"].sum().to_dict()
-
-        prompt = f"""
-        You are a financial advisor AI.
-        Categorize each category from the spending data into:
-        - needs
-        - wants
-        - savings
-        - investments
-
-        Then:
-        1. Calculate totals for each main category.
-        2. Compare with the user's budget allocation.
-        3. Return in **valid JSON only** with this structure:
-        {{
-          "summary": {{
-            "needs": {{"spent": number, "limit": number, "status": "ok/exceeded"}},
-            "wants": {{"spent": number, "limit": number, "status": "ok/exceeded"}},
-            "savings": {{"spent": number, "limit": number, "status": "ok/exceeded"}},
-            "investments": {{"spent": number, "limit": number, "status": "ok/exceeded"}}
-          }},
-          "advice": "Full paragraph(s) of budget optimization advice for the user."
-        }}
-
-        Spending Data: {category_totals}
-        Total Monthly Budget: {total_budget}
-        Allocation Percentages: {allocation_percentages}
-        """
+        # Served from the month x category rollups; no transaction rows are read
+        category_series = store.category_totals(start_month, end_month)
+        category_totals = {str(c): round(float(v), 2) for c, v in category_series.items()}
 
         try:
-            response = model.generate_content(prompt)
-            raw_text = response.text.strip()
-
-            # Extract JSON in case model adds extra text
-            json_match = re.search(r"\{[\s\S]*\}", raw_text)
-            if json_match:
-                raw_text = json_match.group()
-
-            parsed_data = json.loads(raw_text)
+            # Classification and the summary are computed locally; Gemini is asked only about custom
+            # categories never seen before, and for the advice, which is generated while the page renders
+            classes = load_category_classifier().classify(
+                list(category_totals), fallback=lambda unknown: gemini_classify(model, unknown)
+            )
+            summary = budget_classifier.budget_summary(category_totals, classes, total_budget, allocation_percentages)
+            advice_future = None
+            if get_advice:
+                advice_future = ADVICE_POOL.submit(
+                    fetch_advice, model, summary, category_totals, classes, total_budget, allocation_percentages
+                )
+            parsed_data = {"summary": summary, "advice": ""}
 
             # Store in session state
             st.session_state.parsed_data = parsed_data
@@ -108,15 +131,15 @@ def main():
                 st.markdown(f"- **Spent:** ₹{values['spent']}")
                 st.markdown(f"- **Limit:** ₹{values['limit']}")
                 st.markdown(f"- **Status:** {'✅ OK' if values['status']=='ok' else '⚠️ Exceeded'}")
+            with st.expander("🏷️ Category classification"):
+                st.table(pd.DataFrame({"category": list(classes), "class": list(classes.values())}))
 
-            # --- Display Advice ---
-            st.subheader("💡 Fibot Advice")
-            st.markdown(parsed_data["advice"])
+            # --- Display Advice (filled in once the concurrent request returns) ---
+            advice_slot = st.container()
 
             # --- Pie Chart ---
             st.subheader("📊 Spending Breakdown")
-            percentages = (history_df.groupby("category")["amount"].sum() /
-                           history_df["amount"].sum()) * 100
+            percentages = (category_series / category_series.sum()) * 100
             st.session_state.percentages = percentages
             fig, ax = plt.subplots(figsize=(4, 4))
             ax.pie(percentages, labels=percentages.index, autopct='%1.1f%%', startangle=90)
@@ -126,6 +149,16 @@ def main():
             buf.seek(0)
             st.image(buf, width=400)
 
+            if advice_future is not None:
+                with advice_slot:
+                    st.subheader("💡 Fibot Advice")
+                    try:
+                        with st.spinner("Fibot is writing advice..."):
+                            parsed_data["advice"] = advice_future.result()
+                        st.markdown(parsed_data["advice"])
+                    except Exception as e:
+                        st.error(f"Error fetching advice: {e}")
+
         except Exception as e:
             st.error(f"Error: {e}")
             
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Picks the context chunks for a RAG prompt:
+#   1. fetch `candidates` nearest chunks from FAISS (or take a pre-fused candidate list)
+#   2. drop those whose cosine similarity to the query is below `min_similarity`
+#   3. order the rest with maximal marginal relevance so near-identical chunks don't both get in
+#   4. add chunks until `token_budget` prompt tokens (or `max_chunks`) is reached
+# Returns the selected chunk texts with their similarity scores, most relevant first.
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def candidate_vectors(index, ids):
+    # Read-only: IVF indexes get their direct map when they are loaded (index_builder.load_index)
+    return np.vstack([index.reconstruct(int(i)) for i in ids])
+
+def dense_candidates(vectorstore, query_vector, candidates=20):
+    _, ids = vectorstore.index.search(np.asarray([query_vector], dtype=np.float32), candidates)
+    return [int(i) for i in ids[0] if i >= 0]
+
+def pack_in_order(vectorstore, ids, count_tokens, token_budget=384, max_chunks=4):
+    # Lexical fast path: no query vector, so candidates are taken in rank order until the budget is spent
+    chunks, used_tokens = [], 0
+    for i in ids:
+        if len(chunks) >= max_chunks:
+            break
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+        tokens = count_tokens(doc.page_content)
+        if used_tokens + tokens > token_budget:
+            continue
+        chunks.append((doc.page_content, None))
+        used_tokens += tokens
+    return chunks
+
+def build_context(vectorstore, query_vector, count_tokens, candidates=20, min_similarity=0.35,
+                  mmr_lambda=0.7, token_budget=384, max_chunks=4, candidate_ids=None):
+    ids = candidate_ids if candidate_ids is not None else dense_candidates(vectorstore, query_vector, candidates)
+    query = _normalize(np.asarray([query_vector], dtype=np.float32))
+    if not ids:
+        return []
+
+    vectors = _normalize(candidate_vectors(vectorstore.index, ids))
+    relevance = vectors @ query[0]
+    keep = [j for j in range(len(ids)) if relevance[j] >= min_similarity]
+    if not keep:
+        return []
+
+    pairwise = vectors @ vectors.T
+    selected, chunks, used_tokens = [], [], 0
+    remaining = list(keep)
+    while remaining and len(selected) < max_chunks:
+        if selected:
+            redundancy = pairwise[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        mmr = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        best = remaining.pop(int(np.argmax(mmr)))
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[ids[best]])
+        tokens = count_tokens(doc.page_content)
+        # Skip chunks that would overflow the budget; a shorter, less relevant one may still fit
+        if used_tokens + tokens > token_budget:
+            continue
+        selected.append(best)
+        chunks.append((doc.page_content, float(relevance[best])))
+        used_tokens += tokens
+    chunks.sort(key=lambda c: c[1], reverse=True)
+    return chunks
@@ -0,0 +1,147 @@
+import hashlib
+import sqlite3
+import numpy as np
+
+# Drops exact and near-duplicate chunks before they are embedded.
+# Exact: hash of the whitespace/case-normalized text.
+# Near: 64-permutation MinHash over word 3-shingles, bucketed with LSH (16 bands x 4 rows) and
+# confirmed by estimated Jaccard similarity >= threshold against the colliding chunks.
+# The exact, signature and band tables live in SQLite (the build's docs.sqlite, see attach()), so memory
+# stays flat as the corpus grows and a checkpoint only needs the kept-chunk count, not a copy of the tables.
+# A kept chunk's doc_id is its row in the FAISS index, so resuming truncates the tables like the docstore.
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+def _hash32(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+
+def _band_key(band, values):
+    # Bucket key as a signed 64-bit hash of (band number, band rows), stored as a SQLite INTEGER
+    h = hashlib.blake2b(digest_size=8)
+    h.update(bytes([band]))
+    h.update(values.tobytes())
+    return int.from_bytes(h.digest(), "little", signed=True)
+
+class ChunkDeduplicator:
+    def __init__(self, num_perm=64, bands=16, threshold=0.8, shingle_size=3, seed=1):
+        assert num_perm % bands == 0
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+        self.conn = None
+        self.kept = 0
+        self.seen = 0
+        self.exact_dupes = 0
+        self.near_dupes = 0
+
+    def attach(self, path, keep=0, counts=None):
+        # Keeps the tables in the SQLite file at path, dropping chunks >= keep written after the last checkpoint
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = sqlite3.connect(str(path), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dedup_exact (digest BLOB PRIMARY KEY, doc_id INTEGER NOT NULL) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dedup_signatures (doc_id INTEGER PRIMARY KEY, signature BLOB NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dedup_bands (key INTEGER NOT NULL, doc_id INTEGER NOT NULL, "
+            "PRIMARY KEY (key, doc_id)) WITHOUT ROWID"
+        )
+        self.conn.execute("BEGIN")
+        for table in ("dedup_exact", "dedup_signatures", "dedup_bands"):
+            self.conn.execute(f"DELETE FROM {table} WHERE doc_id >= ?", (keep,))
+        self.conn.execute("COMMIT")
+        self.kept = keep
+        counts = counts or {}
+        self.seen = counts.get("seen", 0)
+        self.exact_dupes = counts.get("exact_duplicates", 0)
+        self.near_dupes = counts.get("near_duplicates", 0)
+
+    def counts(self):
+        # What a checkpoint records so a resumed build's report still covers the whole corpus
+        return {"seen": self.seen, "exact_duplicates": self.exact_dupes, "near_duplicates": self.near_dupes}
+
+    def finish(self):
+        # End of build: the tables are only needed while building, so they don't ship with the index
+        if self.conn is None:
+            return
+        for table in ("dedup_exact", "dedup_signatures", "dedup_bands"):
+            self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.execute("VACUUM")
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def signature(self, norm):
+        words = norm.split()
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        hashes = np.fromiter((_hash32(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a*h + b) mod p for every permutation x shingle, min over shingles; uint64 wrap-around is intended
+        with np.errstate(over="ignore"):
+            perm = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME
+        return (perm & MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def is_duplicate(self, text):
+        if self.conn is None:
+            self.attach(":memory:")
+        conn = self.conn
+        self.seen += 1
+        norm = normalize(text)
+        digest = hashlib.blake2b(norm.encode("utf-8"), digest_size=16).digest()
+        if conn.execute("SELECT 1 FROM dedup_exact WHERE digest = ?", (digest,)).fetchone():
+            self.exact_dupes += 1
+            return True
+
+        sig = self.signature(norm)
+        keys = [_band_key(i, sig[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+        candidates = conn.execute(
+            f"SELECT signature FROM dedup_signatures WHERE doc_id IN "
+            f"(SELECT doc_id FROM dedup_bands WHERE key IN ({','.join('?' * len(keys))}))",
+            keys
+        ).fetchall()
+        for (cand,) in candidates:
+            if np.mean(np.frombuffer(cand, dtype=np.uint32) == sig) >= self.threshold:
+                self.near_dupes += 1
+                return True
+
+        doc_id = self.kept
+        self.kept += 1
+        conn.execute("INSERT INTO dedup_exact (digest, doc_id) VALUES (?, ?)", (digest, doc_id))
+        conn.execute("INSERT INTO dedup_signatures (doc_id, signature) VALUES (?, ?)", (doc_id, sig.tobytes()))
+        conn.executemany("INSERT OR IGNORE INTO dedup_bands (key, doc_id) VALUES (?, ?)", [(k, doc_id) for k in keys])
+        return False
+
+    def filter(self, chunks):
+        # One transaction per shard; chunks later in the shard still see the earlier ones
+        if self.conn is None:
+            self.attach(":memory:")
+        self.conn.execute("BEGIN")
+        try:
+            kept = [c for c in chunks if not self.is_duplicate(c)]
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return kept
+
+    def stats(self):
+        dropped = self.exact_dupes + self.near_dupes
+        return {
+            "seen": self.seen,
+            "kept": self.seen - dropped,
+            "exact_duplicates": self.exact_dupes,
+            "near_duplicates": self.near_dupes,
+            "dropped_fraction": dropped / self.seen if self.seen else 0.0
+        }
@@ -0,0 +1,28 @@
+import streamlit as st
+import pandas as pd
+from startup_timeline import TIMELINE, warmup_status
+
+def main():
+    st.title("🩺 Diagnostics")
+
+    status, error = warmup_status()
+    st.subheader("Startup timeline")
+    if status == "off":
+        st.caption("Warm-up is off (set FIBOT_WARMUP=1); stages appear as the first requests load them.")
+    else:
+        st.caption(f"Warm-up: {status}")
+    if error:
+        st.error(f"Warm-up failed: {error}")
+
+    stages = TIMELINE.snapshot()
+    if not stages:
+        st.write("Nothing has been loaded in this server process yet.")
+        return
+    df = pd.DataFrame(stages)
+    df["finished_s"] = df["offset_s"] + df["seconds"]
+    st.dataframe(
+        df[["stage", "offset_s", "seconds", "finished_s", "thread"]].round(2),
+        hide_index=True,
+        use_container_width=True
+    )
+    st.bar_chart(df.groupby("stage", sort=False)["seconds"].sum())
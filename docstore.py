@@ -0,0 +1,81 @@
+import json
+import re
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+from sqlite_store import SQLiteStore
+
+# Chunk texts live in SQLite next to index.faiss and are fetched by id only for the hits of a query,
+# so resident memory no longer grows with the corpus text. Ids are the chunk's row in the FAISS index.
+# The same file holds an FTS5 inverted index over the texts for BM25 lexical retrieval.
+
+STOPWORDS = {
+    "a", "an", "and", "are", "can", "do", "does", "for", "how", "i", "in", "is", "it", "my",
+    "of", "on", "or", "should", "the", "to", "what", "when", "which", "who", "why", "with"
+}
+
+def query_terms(text):
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+class SQLiteDocstore(SQLiteStore, Docstore, AddableMixin):
+    isolation_level = ""  # batched adds rely on sqlite3's implicit transaction + commit()
+
+    def __init__(self, path):
+        SQLiteStore.__init__(self, path)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, text TEXT NOT NULL, metadata TEXT)")
+        conn.commit()
+
+    def add(self, texts):
+        rows = [
+            (int(doc_id), doc.page_content, json.dumps(doc.metadata) if doc.metadata else None)
+            for doc_id, doc in texts.items()
+        ]
+        conn = self._conn()
+        conn.executemany("INSERT OR REPLACE INTO docs (id, text, metadata) VALUES (?, ?, ?)", rows)
+        conn.commit()
+
+    def search(self, search):
+        row = self._conn().execute("SELECT text, metadata FROM docs WHERE id = ?", (int(search),)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]) if row[1] else {})
+
+    def delete(self, ids):
+        conn = self._conn()
+        conn.executemany("DELETE FROM docs WHERE id = ?", [(int(i),) for i in ids])
+        conn.commit()
+
+    def truncate(self, n):
+        # Drops rows written after the last checkpoint of an interrupted build
+        conn = self._conn()
+        conn.execute("DELETE FROM docs WHERE id >= ?", (n,))
+        conn.commit()
+
+    # ---- Lexical (BM25) index ----
+    def has_lexical_index(self):
+        row = self._conn().execute("SELECT 1 FROM sqlite_master WHERE name = 'docs_fts'").fetchone()
+        return row is not None
+
+    def build_lexical_index(self):
+        # External-content FTS5 table: postings only, texts stay in `docs`; 'rebuild' indexes every row in one pass
+        conn = self._conn()
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts "
+            "USING fts5(text, content='docs', content_rowid='id', tokenize='porter unicode61')"
+        )
+        conn.execute("INSERT INTO docs_fts(docs_fts) VALUES('rebuild')")
+        conn.commit()
+
+    def lexical_search(self, terms, k, match_all=False):
+        # Returns (id, score) with higher = better; FTS5's bm25() is negative-is-better
+        if not terms:
+            return []
+        match = (" AND " if match_all else " OR ").join(f'"{t}"' for t in terms)
+        rows = self._conn().execute(
+            "SELECT rowid, bm25(docs_fts) AS score FROM docs_fts WHERE docs_fts MATCH ? ORDER BY score LIMIT ?",
+            (match, k)
+        ).fetchall()
+        return [(int(rowid), -score) for rowid, score in rows]
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
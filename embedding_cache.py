@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+import file_lock
+
+# On-disk layout (one directory per embedding model):
+#   vectors.f32  raw float32 rows, appended and read back through np.memmap
+#   keys.txt     one hex digest per line; line number == row in vectors.f32
+#   meta.json    model name and vector dimension
+#   LOCK         file lock held while syncing or appending, so builders sharing the directory never collide
+
+def cache_key(model_name, text):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+class EmbeddingCache:
+    def __init__(self, cache_dir, model_name):
+        self.model_name = model_name
+        self.dir = Path(cache_dir) / model_name.replace("/", "__")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.keys_path = self.dir / "keys.txt"
+        self.vectors_path = self.dir / "vectors.f32"
+        self.meta_path = self.dir / "meta.json"
+        self.lock_path = self.dir / "LOCK"
+        self.dim = None
+        self.rows = {}
+        self.count = 0  # rows of vectors.f32 known to this process
+        self._keys_bytes = 0  # prefix of keys.txt already read
+        self._matrix = None
+        with file_lock.locked(self.lock_path):
+            self._sync()
+
+    def _sync(self):
+        # Called with the lock held: picks up rows other processes (concurrent builders sharing the cache
+        # directory) appended since the last call, reading only the new part of keys.txt
+        if self.dim is None and self.meta_path.exists():
+            self.dim = json.loads(self.meta_path.read_text())["dim"]
+        if self.dim is None or not self.keys_path.exists():
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_bytes)
+            tail = f.read()
+        keys = tail[:tail.rfind(b"\n") + 1].decode("utf-8").splitlines()
+        # Vectors are appended before keys, so a crash can leave extra vector rows or a torn key line; trim to the
+        # common prefix. Compared in bytes, not rows: a torn last row would otherwise misalign every later append
+        vector_bytes = os.path.getsize(self.vectors_path) if self.vectors_path.exists() else 0
+        n = max(min(self.count + len(keys), vector_bytes // (self.dim * 4)), self.count)
+        keys = keys[:n - self.count]
+        keys_bytes = self._keys_bytes + sum(len(k.encode("utf-8")) + 1 for k in keys)
+        if keys_bytes != self._keys_bytes + len(tail):
+            with open(self.keys_path, "r+b") as f:
+                f.truncate(keys_bytes)
+        if vector_bytes != n * self.dim * 4:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(n * self.dim * 4)
+        for i, k in enumerate(keys):
+            self.rows[k] = self.count + i
+        self.count = n
+        self._keys_bytes = keys_bytes
+
+    def __len__(self):
+        return len(self.rows)
+
+    def matrix(self):
+        n = self.count
+        if n == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != n:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        return self._matrix
+
+    def get_many(self, keys):
+        matrix = self.matrix()
+        return [matrix[self.rows[k]].tolist() if k in self.rows else None for k in keys]
+
+    def put_many(self, keys, vectors):
+        # Appends are serialized across processes by the lock; row numbers come from the files as synced under it
+        with file_lock.locked(self.lock_path):
+            self._sync()
+            new = {}
+            for k, v in zip(keys, vectors):
+                if k not in self.rows and k not in new:
+                    new[k] = v
+            if not new:
+                return
+            block = np.asarray(list(new.values()), dtype=np.float32)
+            if self.dim is None:
+                self.dim = block.shape[1]
+                self.meta_path.write_text(json.dumps({"model": self.model_name, "dim": self.dim}))
+            lines = "".join(k + "\n" for k in new).encode("utf-8")
+            with open(self.vectors_path, "ab") as f:
+                f.write(block.tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(lines)
+            for i, k in enumerate(new):
+                self.rows[k] = self.count + i
+            self.count += len(new)
+            self._keys_bytes += len(lines)
+
+class CachedEmbeddings(Embeddings):
+    # Wraps an embedder so document embeddings are looked up by content hash before being computed
+    def __init__(self, inner, cache):
+        self.inner = inner
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        keys = [cache_key(self.cache.model_name, t) for t in texts]
+        vectors = self.cache.get_many(keys)
+        missing = {}
+        for i, (k, v) in enumerate(zip(keys, vectors)):
+            if v is None:
+                missing.setdefault(k, []).append(i)
+        self.hits += len(texts) - sum(len(idx) for idx in missing.values())
+        self.misses += sum(len(idx) for idx in missing.values())
+        if missing:
+            miss_keys = list(missing)
+            computed = self.inner.embed_documents([texts[missing[k][0]] for k in miss_keys])
+            self.cache.put_many(miss_keys, computed)
+            for k, v in zip(miss_keys, computed):
+                for i in missing[k]:
+                    vectors[i] = list(v)
+        return vectors
+
+    def embed_query(self, text):
+        return self.inner.embed_query(text)
@@ -0,0 +1,83 @@
+import logging
+import multiprocessing as mp
+import os
+import time
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------- Worker Process -----------------------------
+_worker_model = None
+
+def _init_worker(model_name, threads):
+    # Each worker gets its own torch thread set so N workers don't oversubscribe the cores
+    import torch
+    torch.set_num_threads(threads)
+    from sentence_transformers import SentenceTransformer
+    global _worker_model
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+def _embed_batch(job):
+    batch_id, texts = job
+    vectors = _worker_model.encode(texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True)
+    return batch_id, vectors.tolist()
+
+# ----------------------------- Pool Embedder -----------------------------
+def length_buckets(texts, batch_size):
+    # Sorting by length before batching keeps similarly sized chunks together, so each batch pads to a tight max length
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+class ParallelEmbeddings(Embeddings):
+    def __init__(self, model_name, workers, threads_per_worker=None, batch_size=32):
+        self.model_name = model_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.batch_size = batch_size
+        self.chunks = 0
+        self.seconds = 0.0
+        self._pool = None
+        self._query_model = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn, not fork: forking a process that already holds torch/OpenMP state can deadlock
+            ctx = mp.get_context("spawn")
+            self._pool = ctx.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.threads_per_worker)
+            )
+        return self._pool
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        start = time.perf_counter()
+        buckets = length_buckets(texts, self.batch_size)
+        jobs = [(b, [texts[i] for i in idx]) for b, idx in enumerate(buckets)]
+        vectors = [None] * len(texts)
+        for batch_id, batch_vectors in self._get_pool().imap_unordered(_embed_batch, jobs):
+            for i, v in zip(buckets[batch_id], batch_vectors):
+                vectors[i] = v
+        self.seconds += time.perf_counter() - start
+        self.chunks += len(texts)
+        return vectors
+
+    def embed_query(self, text):
+        # Single queries are cheaper in-process than a round trip through the pool
+        if self._query_model is None:
+            from sentence_transformers import SentenceTransformer
+            self._query_model = SentenceTransformer(self.model_name, device="cpu")
+        return self._query_model.encode(text, show_progress_bar=False, convert_to_numpy=True).tolist()
+
+    def report(self):
+        rate = self.chunks / self.seconds if self.seconds else 0.0
+        return (f"Embedded {self.chunks} chunks in {self.seconds:.1f}s "
+                f"({rate:.1f} chunks/s, {self.workers} workers x {self.threads_per_worker} threads)")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Exclusive advisory locks on a lock file, shared by processes on one host (builders, replicas, CLIs).
+# The OS releases a lock when its holder dies, so a killed process never leaves a stale lock behind.
+
+def try_lock(path):
+    # Non-blocking; returns the open lock file, or None if another holder has it
+    f = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def lock(path):
+    # Blocks until the lock is free
+    f = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after ~10 s, so retry
+                    break
+                except OSError:
+                    pass
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+def unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    f.close()
+
+@contextmanager
+def locked(path):
+    f = lock(path)
+    try:
+        yield
+    finally:
+        unlock(f)
@@ -0,0 +1,67 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Collects prompts from concurrent Streamlit sessions and runs them through the model in padded batches.
+# A batch is dispatched when it reaches max_batch_size or max_wait_ms after its first prompt arrived,
+# whichever comes first; each caller blocks only on its own Future.
+
+class GenerationScheduler:
+    def __init__(self, generate_batch, max_batch_size=8, max_wait_ms=50):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._worker = threading.Thread(target=self._run, name="generation-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt):
+        future = Future()
+        self.queue.put((prompt, future))
+        return future
+
+    def generate(self, prompt, timeout=None):
+        return self.submit(prompt).result(timeout)
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                outputs = self.generate_batch(prompts)
+            except Exception as e:
+                logger.exception("Batched generation failed for %d prompts", len(batch))
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "queued": self.queue.qsize()
+        }
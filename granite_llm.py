@@ -0,0 +1,363 @@
+import copy
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer, pipeline
+from startup_timeline import TIMELINE
+
+logger = logging.getLogger(__name__)
+
+MAX_NEW_TOKENS = 256
+# Static start of every RAG prompt built by answer_question; its KV cache is computed once and reused
+PROMPT_PREAMBLE = (
+    "You are a financial assistant. "
+    "Use ONLY the context below to answer the question.\n\n"
+    "Context:\n"
+)
+
+# ----------------------------- Loading -----------------------------
+BACKENDS = ("fp32", "bf16", "int8")
+
+def cpu_supports_bf16():
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def load_tokenizer(model_name):
+    with TIMELINE.stage("tokenizer"):
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # Batched generation pads prompts; decoder-only models must be padded on the left
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    return tokenizer
+
+def load_model(model_name, backend="fp32", shared_weights_dir=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {backend!r} (expected one of {', '.join(BACKENDS)})")
+    if shared_weights_dir and not torch.cuda.is_available():
+        if backend == "int8":
+            raise ValueError("int8 weights are quantized inside each process and cannot be shared; use fp32 or bf16")
+        if backend == "bf16" and not cpu_supports_bf16():
+            logger.warning("This CPU has no native bf16 support; sharing %s in float32", model_name)
+            backend = "fp32"
+        weights_dir = shared_weights_path(shared_weights_dir, model_name, backend)
+        export_shared_weights(model_name, weights_dir, backend)
+        return load_shared_model(weights_dir)
+    tokenizer = load_tokenizer(model_name)
+    if torch.cuda.is_available():
+        with TIMELINE.stage("weights"):
+            model = AutoModelForCausalLM.from_pretrained(
+                model_name,
+                torch_dtype=torch.float16,
+                device_map=None
+            )
+            model=model.to("cuda")
+        return model, tokenizer
+
+    if backend == "bf16" and not cpu_supports_bf16():
+        logger.warning("This CPU has no native bf16 support; loading %s in float32", model_name)
+        backend = "fp32"
+    with TIMELINE.stage("weights"):
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            torch_dtype=torch.bfloat16 if backend == "bf16" else torch.float32,
+            device_map={"": "cpu"}
+        )
+        if backend == "int8":
+            # Dynamic quantization: Linear weights stored as int8, activations quantized on the fly per batch
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return model, tokenizer
+
+def load_pipeline(model_name, backend="fp32", shared_weights_dir=None):
+    model, tokenizer = load_model(model_name, backend, shared_weights_dir)
+    return pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        max_new_tokens=MAX_NEW_TOKENS,
+        temperature=0.2,
+        do_sample=False
+    )
+
+# ----------------------------- Shared (memory-mapped) Weights -----------------------------
+# Replicas on one host map the same safetensors file read-only instead of each copying the weights into
+# private memory, so N processes share one set of physical pages through the OS page cache.
+SAFETENSORS_DTYPES = {"F32": torch.float32, "BF16": torch.bfloat16, "F16": torch.float16}
+SHARED_WEIGHTS_FILE = "model.safetensors"
+
+def shared_weights_path(shared_weights_dir, model_name, backend):
+    return Path(shared_weights_dir) / f"{model_name.replace('/', '__')}-{backend}"
+
+def export_shared_weights(model_name, weights_dir, backend="fp32"):
+    # One-time: a single safetensors file already in the serving dtype, so loading it needs no conversion copy
+    weights_dir = Path(weights_dir)
+    if (weights_dir / SHARED_WEIGHTS_FILE).exists():
+        return weights_dir
+    logger.info("Exporting %s (%s) to %s for memory-mapped loading", model_name, backend, weights_dir)
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        torch_dtype=torch.bfloat16 if backend == "bf16" else torch.float32,
+        device_map={"": "cpu"}
+    )
+    tmp = weights_dir.with_name(f"{weights_dir.name}.tmp{os.getpid()}")
+    model.save_pretrained(tmp, safe_serialization=True, max_shard_size="1000GB")
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp)
+    del model
+    # Renamed into place so a replica never maps a half-written file; if replicas exported at the same time,
+    # the first rename wins and the others discard their copy
+    try:
+        os.replace(tmp, weights_dir)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not (weights_dir / SHARED_WEIGHTS_FILE).exists():
+            raise
+    return weights_dir
+
+def mmap_safetensors(path):
+    with open(path, "rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+        # ACCESS_COPY (MAP_PRIVATE): pages come from the shared page cache and are copied only if written to
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    base = 8 + header_len
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        count = (end - start) // (torch.finfo(dtype).bits // 8)
+        if count == 0:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensors[name] = torch.frombuffer(buffer, dtype=dtype, count=count, offset=base + start).view(info["shape"])
+    return tensors
+
+def load_shared_model(weights_dir):
+    from accelerate import init_empty_weights
+    weights_dir = Path(weights_dir)
+    tokenizer = load_tokenizer(weights_dir)
+    with TIMELINE.stage("weights"):
+        state = mmap_safetensors(weights_dir / SHARED_WEIGHTS_FILE)
+        dtype = next(iter(state.values())).dtype
+        # Parameters start on the meta device (no allocation); buffers such as rotary tables are built normally
+        with init_empty_weights(include_buffers=False):
+            model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(weights_dir), torch_dtype=dtype)
+        # assign=True makes the parameters views of the mapping instead of copying into fresh tensors
+        model.load_state_dict(state, strict=False, assign=True)
+        model.tie_weights()
+        unloaded = [name for name, p in model.named_parameters() if p.is_meta]
+        if unloaded:
+            raise RuntimeError(f"{weights_dir} is missing weights for: {', '.join(unloaded[:5])}")
+        model.eval()
+    return model, tokenizer
+
+# ----------------------------- Prefix KV Cache -----------------------------
+class PrefixCache:
+    def __init__(self, granite_pipe, prefix=PROMPT_PREAMBLE):
+        self.prefix = prefix
+        self.tokenizer = granite_pipe.tokenizer
+        self.model = granite_pipe.model
+        self.prefix_ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.model.device)
+        with torch.no_grad():
+            self.past_key_values = self.model(self.prefix_ids, use_cache=True).past_key_values
+
+    def inputs_for(self, prompt):
+        if not prompt.startswith(self.prefix):
+            return self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        suffix_ids = self.tokenizer(
+            prompt[len(self.prefix):], add_special_tokens=False, return_tensors="pt"
+        ).input_ids.to(self.model.device)
+        input_ids = torch.cat([self.prefix_ids, suffix_ids], dim=1)
+        # generate() appends to the cache in place, so every request works on its own copy of the prefix
+        return {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            "past_key_values": copy.deepcopy(self.past_key_values)
+        }
+
+def measure_prefill(granite_pipe, prefix_cache, prompts, repeats=3):
+    # Wall time of the prompt forward pass (prefill) with and without the cached preamble, in ms per query
+    tokenizer = granite_pipe.tokenizer
+    model = granite_pipe.model
+    full_ms, cached_ms = [], []
+    for prompt in prompts:
+        full_ids = tokenizer(prompt, return_tensors="pt").input_ids.to(model.device)
+        cached = prefix_cache.inputs_for(prompt)
+        suffix_ids = cached["input_ids"][:, prefix_cache.prefix_ids.shape[1]:]
+        for _ in range(repeats):
+            with torch.no_grad():
+                start = time.perf_counter()
+                model(full_ids, use_cache=True)
+                full_ms.append((time.perf_counter() - start) * 1000)
+                past = copy.deepcopy(prefix_cache.past_key_values)
+                start = time.perf_counter()
+                model(suffix_ids, past_key_values=past, use_cache=True)
+                cached_ms.append((time.perf_counter() - start) * 1000)
+    full = sum(full_ms) / len(full_ms)
+    cached = sum(cached_ms) / len(cached_ms)
+    return {
+        "prefix_tokens": prefix_cache.prefix_ids.shape[1],
+        "full_prefill_ms": full,
+        "cached_prefill_ms": cached,
+        "saved_ms": full - cached
+    }
+
+# ----------------------------- Speculative Decoding -----------------------------
+class DraftModel:
+    # A small model sharing Granite's tokenizer proposes tokens that Granite verifies in one forward pass.
+    # Greedy verification keeps the output identical to plain do_sample=False decoding.
+    def __init__(self, model_name, target_model):
+        self.model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            torch_dtype=target_model.dtype,
+            device_map={"": target_model.device}
+        )
+        self.model.eval()
+        # Forward calls are counted per thread: one generate() runs entirely on one thread, so concurrent
+        # sessions (assisted or not) never add to each other's per-answer numbers
+        self._local = threading.local()
+        target_model.register_forward_hook(self._count_target)
+        self.model.register_forward_hook(self._count_draft)
+
+    def _count(self, key):
+        counts = getattr(self._local, "counts", None)
+        if counts is not None:
+            counts[key] += 1
+
+    def _count_target(self, *args):
+        self._count("target")
+
+    def _count_draft(self, *args):
+        self._count("draft")
+
+    @contextmanager
+    def counting(self):
+        # Wraps one generate() call on the calling thread; yields that call's forward-call counts
+        counts = {"target": 0, "draft": 0}
+        self._local.counts = counts
+        try:
+            yield counts
+        finally:
+            self._local.counts = None
+
+    @staticmethod
+    def report(counts, new_tokens, seconds):
+        target_steps = counts["target"]
+        drafted = counts["draft"]
+        # Each Granite step emits the accepted draft tokens plus one token of its own
+        accepted = max(new_tokens - target_steps, 0)
+        return {
+            "new_tokens": new_tokens,
+            "target_steps": target_steps,
+            "draft_tokens": drafted,
+            "acceptance_rate": accepted / drafted if drafted else 0.0,
+            "tokens_per_step": new_tokens / target_steps if target_steps else 0.0,
+            "seconds": seconds,
+            "tokens_per_second": new_tokens / seconds if seconds > 0 else 0.0
+        }
+
+def build_inputs(granite_pipe, prompt, prefix_cache=None, draft=None):
+    if draft is not None:
+        # Assisted decoding manages both models' caches itself, so the shared prefix cache is not used
+        inputs = dict(granite_pipe.tokenizer(prompt, return_tensors="pt").to(granite_pipe.model.device))
+        inputs["assistant_model"] = draft.model
+        return inputs
+    if prefix_cache is not None:
+        return prefix_cache.inputs_for(prompt)
+    return dict(granite_pipe.tokenizer(prompt, return_tensors="pt").to(granite_pipe.model.device))
+
+# ----------------------------- Generation -----------------------------
+def generate_answer(granite_pipe, prompt, prefix_cache=None, draft=None, stats=None):
+    # stats: optional dict filled with this call's speculative-decoding report when a draft model is used
+    if prefix_cache is None and draft is None:
+        output = granite_pipe(prompt, max_new_tokens=MAX_NEW_TOKENS, temperature=0.2, do_sample=False, return_full_text=False)
+        return output[0]['generated_text'].strip()
+    inputs = build_inputs(granite_pipe, prompt, prefix_cache, draft)
+    start = time.perf_counter()
+    with draft.counting() if draft is not None else nullcontext() as counts:
+        with torch.no_grad():
+            output = granite_pipe.model.generate(**inputs, max_new_tokens=MAX_NEW_TOKENS, do_sample=False)
+    seconds = time.perf_counter() - start
+    new_tokens = output[0, inputs["input_ids"].shape[1]:]
+    if draft is not None and stats is not None:
+        stats.update(draft.report(counts, len(new_tokens), seconds))
+    return granite_pipe.tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+
+def generate_batch(granite_pipe, prompts, max_new_tokens=MAX_NEW_TOKENS):
+    tokenizer = granite_pipe.tokenizer
+    model = granite_pipe.model
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+    with torch.no_grad():
+        output = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            pad_token_id=tokenizer.pad_token_id
+        )
+    new_tokens = output[:, inputs["input_ids"].shape[1]:]
+    return [text.strip() for text in tokenizer.batch_decode(new_tokens, skip_special_tokens=True)]
+
+def warm_up(granite_pipe, prompt, prefix_cache=None):
+    # Short generations so the first real request doesn't pay for lazy kernel selection and buffer allocation.
+    # The first one stops after a single token, so its wall time is the cold time-to-first-token.
+    timings = []
+    for max_new_tokens in (1, 8):
+        inputs = build_inputs(granite_pipe, prompt, prefix_cache)
+        start = time.perf_counter()
+        with torch.no_grad():
+            granite_pipe.model.generate(
+                **inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                pad_token_id=granite_pipe.tokenizer.pad_token_id
+            )
+        timings.append((start, time.perf_counter()))
+    return timings[0]
+
+def stream_answer(granite_pipe, prompt, prefix_cache=None, draft=None, stats=None):
+    # generate() runs on a worker thread and pushes decoded text into the streamer as each token lands;
+    # stats is filled as in generate_answer once the stream is exhausted
+    tokenizer = granite_pipe.tokenizer
+    model = granite_pipe.model
+    inputs = build_inputs(granite_pipe, prompt, prefix_cache, draft)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    errors = []
+    counts = None
+
+    def generate():
+        nonlocal counts
+        try:
+            # Counted on the worker thread, which is where generate() calls both models
+            with draft.counting() if draft is not None else nullcontext() as counts:
+                model.generate(**inputs, streamer=streamer, max_new_tokens=MAX_NEW_TOKENS, do_sample=False)
+        except BaseException as e:
+            # Without the stop signal the consumer below would wait on the streamer forever
+            errors.append(e)
+            streamer.end()
+
+    worker = threading.Thread(target=generate)
+    start = time.perf_counter()
+    worker.start()
+    parts = []
+    try:
+        for text in streamer:
+            parts.append(text)
+            yield text
+    finally:
+        worker.join()
+    seconds = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    if draft is not None and stats is not None:
+        new_tokens = len(tokenizer("".join(parts), add_special_tokens=False).input_ids)
+        stats.update(draft.report(counts, new_tokens, seconds))
@@ -0,0 +1,71 @@
+import bisect
+import threading
+from docstore import query_terms
+
+# In-memory inverted index over past questions and answers, kept in step with the HistoryStore log.
+# Only each entry's question is held for labels; the full entry is read from SQLite when it is opened.
+# Search is AND over query terms, each matched as a word prefix (so partial words work while typing),
+# newest matches first; listing and search both return one page, so sidebar cost doesn't grow with history.
+
+class HistoryIndex:
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.postings = {}
+        self.questions = {}
+        self.ids = []  # ascending, since the log is append-only
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self.refresh()
+
+    def refresh(self):
+        # Picks up entries appended since the last call, including those written by other sessions
+        with self.lock:
+            last_id = self.ids[-1] if self.ids else 0
+            for entry in self.store.since(last_id):
+                self._add(entry)
+
+    def _add(self, entry):
+        entry_id = entry["id"]
+        self.ids.append(entry_id)
+        self.questions[entry_id] = entry["question"]
+        for term in set(query_terms(entry["question"] + " " + entry["answer"])):
+            posting = self.postings.get(term)
+            if posting is None:
+                self.postings[term] = posting = set()
+                self._vocabulary_dirty = True
+            posting.add(entry_id)
+
+    def _prefix_matches(self, prefix):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        matches = set()
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            matches |= self.postings[term]
+        return matches
+
+    def __len__(self):
+        return len(self.ids)
+
+    def page(self, page=0, page_size=50):
+        # Newest first: (id, question) pairs
+        with self.lock:
+            end = len(self.ids) - page * page_size
+            ids = self.ids[max(end - page_size, 0):max(end, 0)]
+            return [(i, self.questions[i]) for i in reversed(ids)]
+
+    def search(self, query, page=0, page_size=50):
+        # Returns (total matches, one page of (id, question) pairs)
+        terms = query_terms(query)
+        if not terms:
+            return len(self), self.page(page, page_size)
+        with self.lock:
+            sets = sorted((self._prefix_matches(t) for t in terms), key=len)
+            matched = sets[0].intersection(*sets[1:])
+            ids = sorted(matched, reverse=True)
+            start = page * page_size
+            return len(ids), [(i, self.questions[i]) for i in ids[start:start + page_size]]
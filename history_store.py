@@ -0,0 +1,106 @@
+import csv
+import json
+import logging
+import os
+import time
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Append-only search history in SQLite (WAL): every answered question is one INSERT, so saving no longer
+# rewrites the whole file and concurrent sessions can't clobber each other's entries. Reads are paginated
+# by rowid, and an index on the question text serves "was this asked before" lookups.
+# The legacy search_history.csv is imported once, the first time the database is opened.
+
+SCHEMA_VERSION = 1
+
+class HistoryStore(SQLiteStore):
+    def __init__(self, path, legacy_csv=None):
+        super().__init__(path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT NOT NULL, answer TEXT NOT NULL, "
+            "sources TEXT, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS history_question ON history(question)")
+        imported = []
+
+        def import_csv(conn, version):
+            if legacy_csv and os.path.exists(legacy_csv):
+                with open(legacy_csv, "r", encoding="utf-8") as f:
+                    imported.extend((row[0], row[1], None, 0.0) for row in csv.reader(f) if len(row) >= 2)
+                conn.executemany("INSERT INTO history (question, answer, sources, created) VALUES (?, ?, ?, ?)", imported)
+
+        self.migrate(SCHEMA_VERSION, import_csv)
+        if imported:
+            logger.info("Imported %d entries from %s into %s", len(imported), legacy_csv, self.path)
+
+    @staticmethod
+    def _entry(row):
+        return {
+            "id": row[0],
+            "question": row[1],
+            "answer": row[2],
+            "sources": json.loads(row[3]) if row[3] else [],
+            "created": row[4]
+        }
+
+    def append(self, question, answer, sources=()):
+        # A single INSERT in autocommit mode is atomic; readers never see a partial entry
+        cur = self._conn().execute(
+            "INSERT INTO history (question, answer, sources, created) VALUES (?, ?, ?, ?)",
+            (question, answer, json.dumps(list(sources)) if sources else None, time.time())
+        )
+        return cur.lastrowid
+
+    def get(self, entry_id):
+        row = self._conn().execute(
+            "SELECT id, question, answer, sources, created FROM history WHERE id = ?", (entry_id,)
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def find(self, question):
+        # Most recent answer to exactly this question, via the question index
+        row = self._conn().execute(
+            "SELECT id, question, answer, sources, created FROM history WHERE question = ? ORDER BY id DESC LIMIT 1",
+            (question,)
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def page(self, page=0, page_size=50):
+        # Newest first
+        rows = self._conn().execute(
+            "SELECT id, question, answer, sources, created FROM history ORDER BY id DESC LIMIT ? OFFSET ?",
+            (page_size, page * page_size)
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def since(self, last_id=0, batch_size=1000):
+        # Entries with id > last_id in insertion order, for readers that follow the log incrementally
+        while True:
+            rows = self._conn().execute(
+                "SELECT id, question, answer, sources, created FROM history WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._entry(row)
+            last_id = rows[-1][0]
+
+    def last(self):
+        entries = self.page(0, 1)
+        return entries[0] if entries else None
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    store = HistoryStore(
+        sys.argv[1] if len(sys.argv) > 1 else "search_history.sqlite",
+        sys.argv[2] if len(sys.argv) > 2 else "search_history.csv"
+    )
+    print(f"{len(store)} history entries in {store.path}")
@@ -0,0 +1,59 @@
+import threading
+from collections import defaultdict, deque
+import numpy as np
+from docstore import query_terms
+
+# BM25 (SQLite FTS5) + dense retrieval.
+#   fast path: short keyword queries whose terms all match with a high BM25 score skip the embedder entirely
+#   otherwise: dense and lexical rankings are merged with reciprocal-rank fusion
+
+def rrf_fuse(rankings, k=60, limit=None):
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return fused[:limit] if limit else fused
+
+class RetrievalStats:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, path, seconds):
+        with self.lock:
+            self.latencies[path].append(seconds * 1000)
+
+    def summary(self):
+        with self.lock:
+            return {
+                path: {
+                    "count": len(values),
+                    "mean_ms": float(np.mean(values)),
+                    "p95_ms": float(np.percentile(values, 95))
+                }
+                for path, values in self.latencies.items() if values
+            }
+
+class HybridRetriever:
+    def __init__(self, docstore, candidates=20, rrf_k=60, fast_path_max_terms=3, fast_path_min_score=8.0):
+        self.docstore = docstore
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.fast_path_max_terms = fast_path_max_terms
+        self.fast_path_min_score = fast_path_min_score
+        self.stats = RetrievalStats()
+
+    def confident_lexical(self, question):
+        # Confident = few content terms, every one of them present in the top hit, and a strong BM25 score
+        terms = query_terms(question)
+        if not terms or len(terms) > self.fast_path_max_terms:
+            return None
+        hits = self.docstore.lexical_search(terms, self.candidates, match_all=True)
+        if hits and hits[0][1] >= self.fast_path_min_score:
+            return [doc_id for doc_id, _ in hits]
+        return None
+
+    def fuse(self, question, dense_ids):
+        lexical_ids = [doc_id for doc_id, _ in self.docstore.lexical_search(query_terms(question), self.candidates)]
+        return rrf_fuse([dense_ids, lexical_ids], k=self.rrf_k, limit=self.candidates)
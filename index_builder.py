@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+from pathlib import Path
+import faiss
+import numpy as np
+from datasets import load_dataset
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+from docstore import SQLiteDocstore
+
+logger = logging.getLogger(__name__)
+
+HF_DATASETS = [
+    "SALT-NLP/FLUE-FiQA",
+    "sujet-ai/Sujet-Finance-Instruct-177k",
+    "bilalRahib/fiqa-personal-finance-dataset"
+]
+CHECKPOINT_DIR = "checkpoint"
+LATEST_FILE = "LATEST"
+PROGRESS_FILE = "progress.json"
+DOCSTORE_FILE = "docs.sqlite"
+REPORT_FILE = "build_report.json"
+
+# ----------------------------- Corpus Streaming -----------------------------
+def row_to_text(row, cols):
+    if "text" in cols:
+        return row["text"]
+    elif "sentence" in cols:
+        return row["sentence"]
+    elif "question" in cols and "answer" in cols:
+        return f"Q: {row['question']}\nA: {row['answer']}"
+    return row[cols[0]]
+
+def iter_dataset_rows(ds_name, start_row=0):
+    # streaming=True reads the parquet/json shards lazily instead of materializing the split
+    ds = load_dataset(ds_name, split="train", streaming=True)
+    if start_row:
+        ds = ds.skip(start_row)
+    cols = ds.column_names
+    for row in ds:
+        if cols is None:
+            cols = list(row.keys())
+        yield row_to_text(row, cols)
+
+def iter_corpus(datasets, cursor):
+    # cursor = (dataset index, rows already consumed from that dataset)
+    start_ds, start_row = cursor
+    for ds_idx in range(start_ds, len(datasets)):
+        row_idx = start_row if ds_idx == start_ds else 0
+        for text in iter_dataset_rows(datasets[ds_idx], row_idx):
+            row_idx += 1
+            yield text, (ds_idx, row_idx)
+        yield None, (ds_idx + 1, 0)
+
+def iter_shards(datasets, splitter, cursor, batch_size):
+    # A shard is flushed only on a row boundary, so its cursor is always a safe resume point
+    chunks = []
+    for text, cursor in iter_corpus(datasets, cursor):
+        if text is not None:
+            chunks.extend(splitter.split_text(str(text)))
+        if len(chunks) >= batch_size or (text is None and chunks):
+            yield chunks, cursor
+            chunks = []
+    if chunks:
+        yield chunks, cursor
+
+# ----------------------------- Docstore -----------------------------
+def positional_ids(start, n):
+    # Docstore ids are the vector's row in the FAISS index, so the id map never needs to be persisted
+    return [str(i) for i in range(start, start + n)]
+
+def wrap_index(index, embeddings, docstore):
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(positional_ids(0, index.ntotal)))
+    )
+
+def add_pairs(vectorstore, pairs):
+    if not pairs:
+        return
+    vectorstore.add_embeddings(pairs, ids=positional_ids(vectorstore.index.ntotal, len(pairs)))
+
+def migrate_pickled_docstore(index_dir, batch_size=10000):
+    # Converts a LangChain save_local directory (index.faiss + pickled index.pkl) to docs.sqlite
+    index_dir = Path(index_dir)
+    pkl = index_dir / "index.pkl"
+    with open(pkl, "rb") as f:
+        old_docstore, index_to_docstore_id = pickle.load(f)
+    tmp = index_dir / (DOCSTORE_FILE + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    docstore = SQLiteDocstore(tmp)
+    batch = {}
+    for i in range(len(index_to_docstore_id)):
+        batch[str(i)] = old_docstore.search(index_to_docstore_id[i])
+        if len(batch) >= batch_size:
+            docstore.add(batch)
+            batch = {}
+    if batch:
+        docstore.add(batch)
+    docstore.close()
+    os.replace(tmp, index_dir / DOCSTORE_FILE)
+    pkl.unlink()
+    logger.info("Migrated %d chunks from %s to %s", len(index_to_docstore_id), pkl, DOCSTORE_FILE)
+
+# ----------------------------- Checkpoints -----------------------------
+def load_checkpoint(index_dir, embeddings, docstore, deduplicator=None):
+    ckpt_root = Path(index_dir) / CHECKPOINT_DIR
+    latest = ckpt_root / LATEST_FILE
+    if not latest.exists():
+        docstore.truncate(0)
+        if deduplicator is not None:
+            deduplicator.attach(docstore.path)
+        return None, {"cursor": [0, 0], "shards": 0, "chunks": 0}, deduplicator
+    ckpt = ckpt_root / latest.read_text().strip()
+    progress = json.loads((ckpt / PROGRESS_FILE).read_text())
+    index = faiss.read_index(str(ckpt / "index.faiss"))
+    docstore.truncate(index.ntotal)
+    if deduplicator is not None:
+        # The dedup tables share docs.sqlite, so they are cut back to the checkpoint the same way
+        deduplicator.attach(docstore.path, keep=index.ntotal, counts=progress.get("dedup"))
+    logger.info("Resuming index build from %s (%d chunks)", ckpt.name, progress["chunks"])
+    return wrap_index(index, embeddings, docstore), progress, deduplicator
+
+def save_checkpoint(index_dir, vectorstore, progress, deduplicator=None):
+    ckpt_root = Path(index_dir) / CHECKPOINT_DIR
+    name = f"shard-{progress['shards']:06d}"
+    ckpt = ckpt_root / name
+    ckpt.mkdir(parents=True, exist_ok=True)
+    # Chunk texts are already committed to the docstore; only the vectors need snapshotting
+    faiss.write_index(vectorstore.index, str(ckpt / "index.faiss"))
+    if deduplicator is not None:
+        progress["dedup"] = deduplicator.counts()
+    # progress.json is written last and LATEST is swapped atomically, so a crash never exposes a half-written checkpoint
+    (ckpt / PROGRESS_FILE).write_text(json.dumps(progress))
+    tmp = ckpt_root / (LATEST_FILE + ".tmp")
+    tmp.write_text(name)
+    os.replace(tmp, ckpt_root / LATEST_FILE)
+    for old in ckpt_root.glob("shard-*"):
+        if old.name != name:
+            shutil.rmtree(old, ignore_errors=True)
+    logger.info("Checkpoint %s written (%d chunks)", name, progress["chunks"])
+
+# ----------------------------- Index Types -----------------------------
+def index_factory_string(index_type, nlist=1024, pq_m=48, hnsw_m=32):
+    if index_type == "flat":
+        return None
+    if index_type == "ivfpq":
+        # pq_m sub-quantizers of 8 bits each: 384-d float32 (1536 B) -> 48 B per vector
+        return f"IVF{nlist},PQ{pq_m}x8"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m},Flat"
+    raise ValueError(f"Unknown index type: {index_type!r} (expected flat, ivfpq or hnsw)")
+
+def create_vectorstore(index, texts, matrix, embeddings, docstore):
+    if not index.is_trained:
+        logger.info("Training %s on %d vectors", type(faiss.downcast_index(index)).__name__, len(matrix))
+        index.train(matrix)
+    vectorstore = wrap_index(index, embeddings, docstore)
+    add_pairs(vectorstore, list(zip(texts, matrix)))
+    return vectorstore
+
+def read_faiss_index(path, mmap=False):
+    if mmap:
+        # Memory-mapped, read-only: replicas on one host share the page cache instead of each holding a private copy
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            return faiss.read_index(str(path), flags)
+        except RuntimeError as e:
+            logger.warning("Cannot memory-map %s (%s); loading it into memory", path, e)
+    return faiss.read_index(str(path))
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    params = faiss.ParameterSpace()
+    if nprobe and faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search and "HNSW" in type(faiss.downcast_index(index)).__name__:
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+def load_index(index_dir, embeddings, mmap=False, nprobe=None, ef_search=None):
+    index_dir = Path(index_dir)
+    index = read_faiss_index(index_dir / "index.faiss", mmap=mmap)
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # IVF can only reconstruct() by id (for MMR) with a direct map; built here once, before any session
+        # shares the index, so the query path never mutates it
+        ivf.make_direct_map()
+    if (index_dir / "index.pkl").exists() and not (index_dir / DOCSTORE_FILE).exists():
+        migrate_pickled_docstore(index_dir)
+    docstore = SQLiteDocstore(index_dir / DOCSTORE_FILE)
+    if not docstore.has_lexical_index():
+        logger.info("Building the BM25 lexical index for %s", index_dir)
+        docstore.build_lexical_index()
+    return wrap_index(index, embeddings, docstore)
+
+# ----------------------------- Streaming Build -----------------------------
+def build_index(index_dir, embeddings, chunk_size, chunk_overlap,
+                batch_size=256, checkpoint_every=20, datasets=HF_DATASETS,
+                index_factory=None, train_size=50000, deduplicator=None):
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    docstore = SQLiteDocstore(Path(index_dir) / DOCSTORE_FILE)
+    vectorstore, progress, deduplicator = load_checkpoint(index_dir, embeddings, docstore, deduplicator)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    # Index types that need training (IVF-PQ) buffer their first train_size vectors in one preallocated float32
+    # array; the rest (flat, HNSW) are created on the first shard, so they add and checkpoint from the start
+    index = None
+    train_texts, train_matrix = [], None
+    since_checkpoint = 0
+    for chunks, cursor in iter_shards(datasets, splitter, tuple(progress["cursor"]), batch_size):
+        if deduplicator is not None:
+            chunks = deduplicator.filter(chunks)
+        vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32) if chunks else None
+        if chunks and vectorstore is None:
+            if index is None:
+                index = faiss.index_factory(vectors.shape[1], index_factory or "Flat")
+                if not index.is_trained:
+                    train_matrix = np.empty((train_size, vectors.shape[1]), dtype=np.float32)
+            if index.is_trained:
+                vectorstore = create_vectorstore(index, chunks, vectors, embeddings, docstore)
+            else:
+                filled = len(train_texts)
+                take = min(len(chunks), train_size - filled)
+                train_matrix[filled:filled + take] = vectors[:take]
+                train_texts.extend(chunks[:take])
+                if len(train_texts) == train_size:
+                    vectorstore = create_vectorstore(index, train_texts, train_matrix, embeddings, docstore)
+                    train_texts, train_matrix = [], None
+                    add_pairs(vectorstore, list(zip(chunks[take:], vectors[take:])))
+        elif chunks:
+            add_pairs(vectorstore, list(zip(chunks, vectors)))
+
+        progress["cursor"] = list(cursor)
+        progress["shards"] += 1
+        progress["chunks"] += len(chunks)
+        since_checkpoint += 1
+        if vectorstore is not None and since_checkpoint >= checkpoint_every:
+            save_checkpoint(index_dir, vectorstore, progress, deduplicator)
+            since_checkpoint = 0
+
+    if vectorstore is None and train_texts:
+        # Corpus smaller than train_size: train on what there is
+        vectorstore = create_vectorstore(index, train_texts, train_matrix[:len(train_texts)], embeddings, docstore)
+    if vectorstore is None:
+        raise RuntimeError("No chunks were produced from the configured datasets.")
+    if deduplicator is not None:
+        deduplicator.finish()
+    docstore.build_lexical_index()
+    # index.faiss appearing is what marks the build complete, so it is renamed into place in one step
+    tmp = Path(index_dir) / "index.faiss.tmp"
+    faiss.write_index(vectorstore.index, str(tmp))
+    os.replace(tmp, Path(index_dir) / "index.faiss")
+    shutil.rmtree(Path(index_dir) / CHECKPOINT_DIR, ignore_errors=True)
+    write_build_report(index_dir, progress, deduplicator)
+    return vectorstore
+
+def write_build_report(index_dir, progress, deduplicator=None):
+    index_bytes = os.path.getsize(Path(index_dir) / "index.faiss")
+    docs_bytes = os.path.getsize(Path(index_dir) / DOCSTORE_FILE)
+    report = {"chunks": progress["chunks"], "index_bytes": index_bytes, "docstore_bytes": docs_bytes}
+    logger.info("Index build finished: %d chunks, index.faiss %.1f MB", progress["chunks"], index_bytes / 2**20)
+    if deduplicator is not None:
+        stats = deduplicator.stats()
+        # Index and docstore size scale linearly with the chunk count, so the saving is the dropped fraction
+        kept = max(stats["kept"], 1)
+        stats["index_bytes_without_dedup"] = int(index_bytes * stats["seen"] / kept)
+        stats["docstore_bytes_without_dedup"] = int(docs_bytes * stats["seen"] / kept)
+        report["dedup"] = stats
+        logger.info(
+            "Dedup dropped %d exact + %d near duplicates of %d chunks (%.1f%%); index %.1f MB instead of ~%.1f MB",
+            stats["exact_duplicates"], stats["near_duplicates"], stats["seen"], 100 * stats["dropped_fraction"],
+            index_bytes / 2**20, stats["index_bytes_without_dedup"] / 2**20
+        )
+    (Path(index_dir) / REPORT_FILE).write_text(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    migrate_pickled_docstore(sys.argv[1] if len(sys.argv) > 1 else "faiss_index")
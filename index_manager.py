@@ -0,0 +1,183 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from file_lock import try_lock, unlock
+
+logger = logging.getLogger(__name__)
+
+# Versioned index layout:
+#   INDEX_DIR/versions/<version>/   one complete index directory each (index.faiss, docs.sqlite, ...)
+#   INDEX_DIR/CURRENT               name of the version being served, swapped atomically with os.replace
+# A flat pre-versioning INDEX_DIR (index.faiss at its top level) is still served as-is until the first rebuild.
+# LiveIndex holds the served (vectorstore, retriever) pair; a rebuild runs on a background thread into a new
+# version and the reference is swapped only once it has loaded, so queries never wait on a build.
+# A build holds an OS lock on <version>/BUILD_LOCK, so two builders (rebuild_index.py, an admin rebuild,
+# another replica) never write the same version; the lock is released by the OS if the builder dies.
+
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+LEGACY_VERSION = "legacy"
+BUILD_LOCK = "BUILD_LOCK"
+
+def current_version(index_dir):
+    index_dir = Path(index_dir)
+    current = index_dir / CURRENT_FILE
+    if current.exists():
+        return current.read_text().strip()
+    if (index_dir / "index.faiss").exists():
+        return LEGACY_VERSION
+    return None
+
+def version_dir(index_dir, version):
+    if version == LEGACY_VERSION:
+        return Path(index_dir)
+    return Path(index_dir) / VERSIONS_DIR / version
+
+def resolve(index_dir):
+    # Directory of the version currently being served
+    version = current_version(index_dir)
+    return version_dir(index_dir, version) if version is not None else Path(index_dir)
+
+def is_complete(path):
+    # build_index renames index.faiss into place as its very last step
+    return (Path(path) / "index.faiss").exists()
+
+def _claim(versions):
+    # An interrupted build is resumed from its checkpoint; versions another builder holds are skipped
+    for name in sorted((p.name for p in versions.iterdir() if p.is_dir() and not is_complete(p)), reverse=True):
+        lock = try_lock(versions / name / BUILD_LOCK)
+        if lock is not None:
+            if not is_complete(versions / name):  # it may have finished between listing and locking
+                return name, lock
+            unlock(lock)
+    base = time.strftime("v%Y%m%d-%H%M%S")
+    for n in range(1, 1000):
+        name = base if n == 1 else f"{base}-{n}"
+        try:
+            (versions / name).mkdir()
+        except FileExistsError:
+            continue
+        lock = try_lock(versions / name / BUILD_LOCK)
+        # None: a concurrent builder resumed this fresh directory first; the caller looks again
+        return (name, lock) if lock is not None else (None, None)
+    raise RuntimeError(f"Could not create a new index version in {versions}")
+
+@contextmanager
+def claim_version(index_dir):
+    # Yields (version, path) of a version directory that only this builder writes until the block exits
+    versions = Path(index_dir) / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    version, lock = None, None
+    while lock is None:
+        version, lock = _claim(versions)
+    path = versions / version
+    try:
+        yield version, path
+    finally:
+        unlock(lock)
+        if is_complete(path):
+            # A finished version is never claimed again, so its lock file can go
+            try:
+                os.remove(path / BUILD_LOCK)
+            except OSError:
+                pass
+
+def publish(index_dir, version):
+    if not is_complete(version_dir(index_dir, version)):
+        raise RuntimeError(f"Index version {version} is not complete")
+    tmp = Path(index_dir) / (CURRENT_FILE + ".tmp")
+    tmp.write_text(version)
+    os.replace(tmp, Path(index_dir) / CURRENT_FILE)
+    logger.info("Index version %s published", version)
+
+def prune(index_dir, keep=2):
+    # Keeps the newest `keep` complete versions (always including CURRENT); older ones are deleted
+    versions = Path(index_dir) / VERSIONS_DIR
+    if not versions.exists():
+        return
+    live = current_version(index_dir)
+    complete = sorted((p.name for p in versions.iterdir() if p.is_dir() and is_complete(p)), reverse=True)
+    for name in complete[keep:]:
+        if name != live:
+            shutil.rmtree(versions / name, ignore_errors=True)
+            logger.info("Pruned index version %s", name)
+
+class LiveIndex:
+    def __init__(self, index_dir, open_version, build_version=None, poll_seconds=0, keep_versions=2):
+        # open_version(path) -> (vectorstore, retriever); build_version(path) builds a complete index into path
+        self.index_dir = Path(index_dir)
+        self.open_version = open_version
+        self.build_version = build_version
+        self.keep_versions = keep_versions
+        self.lock = threading.Lock()
+        self.status = "idle"
+        self.error = None
+        self._rebuild = None
+        self._unloadable = None
+        version = current_version(index_dir)
+        if version is None:
+            version = self._build()
+            publish(index_dir, version)
+        self.version = version
+        self._served = open_version(version_dir(index_dir, version))
+        if poll_seconds > 0:
+            # Picks up versions published by another process (rebuild_index.py or another replica)
+            threading.Thread(target=self._watch, args=(poll_seconds,), name="index-watcher", daemon=True).start()
+
+    def snapshot(self):
+        # One reference read: a request keeps using this pair even if a swap happens mid-answer
+        return self._served
+
+    def _build(self):
+        if self.build_version is None:
+            raise RuntimeError(f"No index in {self.index_dir} and no build function configured")
+        with claim_version(self.index_dir) as (version, path):
+            logger.info("Building index version %s", version)
+            self.build_version(path)
+        return version
+
+    def _swap(self, version):
+        served = self.open_version(version_dir(self.index_dir, version))
+        with self.lock:
+            self._served = served
+            self.version = version
+        logger.info("Now serving index version %s", version)
+
+    def rebuild_async(self):
+        with self.lock:
+            if self._rebuild is not None and self._rebuild.is_alive():
+                return False
+            self._rebuild = threading.Thread(target=self._run_rebuild, name="index-rebuild", daemon=True)
+            self.status = "building"
+            self.error = None
+        self._rebuild.start()
+        return True
+
+    def _run_rebuild(self):
+        try:
+            version = self._build()
+            self._swap(version)
+            publish(self.index_dir, version)
+            prune(self.index_dir, self.keep_versions)
+            self.status = "idle"
+        except Exception as e:
+            logger.exception("Background index rebuild failed; still serving %s", self.version)
+            self.status = "failed"
+            self.error = str(e)
+
+    def _watch(self, poll_seconds):
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                version = current_version(self.index_dir)
+                if version in (None, self.version, self._unloadable) or self.status == "building":
+                    continue
+                self._swap(version)
+            except Exception:
+                # Not retried until a different version is published
+                self._unloadable = version
+                logger.exception("Could not load published index version %s", version)
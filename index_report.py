@@ -0,0 +1,78 @@
+# Recall@k vs latency of a compressed index (IVF-PQ / HNSW) against the exact flat index.
+# Both directories must be built from the same corpus, e.g.
+#   FIBOT_INDEX_DIR=faiss_index_ivfpq FIBOT_INDEX_TYPE=ivfpq streamlit run rag_granite_finance.py
+#   python index_report.py faiss_index faiss_index_ivfpq
+import argparse
+import os
+import time
+import faiss
+import numpy as np
+import index_builder
+import index_manager
+from history_store import HistoryStore
+
+def load_queries(flat, n_samples, history_file, embed_model, seed=0):
+    # Stored chunk vectors are stand-ins for real traffic; past questions are added when available
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(flat.ntotal, size=min(n_samples, flat.ntotal), replace=False)
+    queries = [flat.reconstruct(int(i)) for i in ids]
+    if history_file and os.path.exists(history_file):
+        from langchain_huggingface import HuggingFaceEmbeddings
+        questions = [entry["question"] for entry in HistoryStore(history_file).since(0)]
+        if questions:
+            queries.extend(HuggingFaceEmbeddings(model_name=embed_model).embed_documents(questions))
+    return np.asarray(queries, dtype=np.float32)
+
+def timed_search(index, queries, k):
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+def recall_at_k(truth, found):
+    hits = [len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)]
+    return float(np.mean(hits))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a compressed FAISS index with the flat index.")
+    parser.add_argument("flat_dir")
+    parser.add_argument("candidate_dir")
+    parser.add_argument("-k", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64")
+    parser.add_argument("--ef-search", default="16,32,64,128,256")
+    parser.add_argument("--mmap", action="store_true")
+    parser.add_argument("--history", default="search_history.sqlite")
+    parser.add_argument("--embed-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    # A versioned index directory is compared through the version it currently serves
+    args.flat_dir = str(index_manager.resolve(args.flat_dir))
+    args.candidate_dir = str(index_manager.resolve(args.candidate_dir))
+    faiss.omp_set_num_threads(1)  # per-query latency as a single Streamlit request sees it
+    flat = index_builder.read_faiss_index(os.path.join(args.flat_dir, "index.faiss"))
+    candidate = index_builder.read_faiss_index(os.path.join(args.candidate_dir, "index.faiss"), mmap=args.mmap)
+    if flat.ntotal != candidate.ntotal:
+        raise SystemExit(f"Index sizes differ ({flat.ntotal} vs {candidate.ntotal}); build both from the same corpus.")
+
+    queries = load_queries(flat, args.queries, args.history, args.embed_model)
+    truth, flat_ms = timed_search(flat, queries, args.k)
+
+    if faiss.try_extract_index_ivf(candidate) is not None:
+        param, values = "nprobe", [int(v) for v in args.nprobe.split(",")]
+    else:
+        param, values = "efSearch", [int(v) for v in args.ef_search.split(",")]
+
+    flat_mb = os.path.getsize(os.path.join(args.flat_dir, "index.faiss")) / 2**20
+    cand_mb = os.path.getsize(os.path.join(args.candidate_dir, "index.faiss")) / 2**20
+    print(f"{len(queries)} queries, k={args.k}")
+    print(f"flat:      {flat_mb:8.1f} MB  {flat_ms:7.3f} ms/query  recall@{args.k}=1.000")
+    print(f"candidate: {cand_mb:8.1f} MB  ({faiss.downcast_index(candidate).__class__.__name__})")
+    print(f"{param:>9} | recall@{args.k} | ms/query | speedup")
+    params = faiss.ParameterSpace()
+    for value in values:
+        params.set_index_parameter(candidate, param, value)
+        found, ms = timed_search(candidate, queries, args.k)
+        print(f"{value:>9} | {recall_at_k(truth, found):8.3f} | {ms:8.3f} | {flat_ms / ms:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,38 @@
 import streamlit as st
+import importlib, os, sys, time
 from urllib.parse import urlencode
-import budget_summaries
-import spending_insights
-import NLU_Analysis
-import rag_granite_finance
-import about_fibot
+from startup_timeline import TIMELINE, start_warmup
+
+# Page modules are imported the first time their ?page= is requested, so the home page never pays for
+# torch, transformers, langchain, reportlab, matplotlib or google-generativeai
+PAGE_MODULES = {
+    "chatbot": "rag_granite_finance",
+    "try": "rag_granite_finance",
+    "budget": "budget_summaries",
+    "spending": "spending_insights",
+    "nlu": "NLU_Analysis",
+    "know": "about_fibot",
+    "diagnostics": "diagnostics",
+}
+
+def load_page(name):
+    # Always through import_module: it waits on the module's import lock, so a page opened while the warm-up
+    # thread is still importing it gets the finished module rather than a half-initialized one
+    first = name not in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if first:
+        TIMELINE.record_once(f"import {name}", start)
+    return module
+
+def warm_up():
+    load_page("rag_granite_finance").warm_up()
 st.set_page_config(page_title="Fibot - Financial Advice Assistant", page_icon="💰", layout="wide")
 
+# Opt-in: load Granite, the embedder and the FAISS index in the background as soon as the server boots
+if os.getenv("FIBOT_WARMUP", "0") == "1":
+    start_warmup(warm_up)
+
 # Custom CSS + Animation
 st.markdown("""
     <style>
@@ -192,16 +218,8 @@ st.markdown(
 # --- PAGE LOADING ---
 params = st.query_params
 page = params.get("page", "home")
-if page == "chatbot" or page=="try":
-    rag_granite_finance.main()
-elif page == "budget":
-    budget_summaries.main()
-elif page == "spending":
-    spending_insights.main()
-elif page == "nlu":
-    NLU_Analysis.main()
-elif page == "know":
-    about_fibot.main()
+if page in PAGE_MODULES:
+    load_page(PAGE_MODULES[page]).main()
 else: 
  # Default to home page
 # Center section
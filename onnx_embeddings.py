@@ -0,0 +1,114 @@
+import argparse
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Sentence-transformers MiniLM served through onnxruntime: the model is exported to ONNX once
+# (optionally int8-quantized) and afterwards query and corpus embeddings need neither torch nor transformers.
+# Mean pooling + L2 normalization reproduce the sentence-transformers pipeline of all-MiniLM-L6-v2.
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+def export_onnx(model_name, model_dir, quantize=False):
+    # Everything is written under a temporary name and renamed into place, model.onnx last, so a killed export
+    # or two replicas exporting at once never leave a truncated model that every later start would trip over
+    model_dir = Path(model_dir)
+    fp32_path = model_dir / "model.onnx"
+    int8_path = model_dir / "model.int8.onnx"
+    if not fp32_path.exists():
+        # torch/transformers are only needed for this one-time export
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        model_dir.mkdir(parents=True, exist_ok=True)
+        tmp = model_dir.with_name(f"{model_dir.name}.tmp{os.getpid()}")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        tokenizer.save_pretrained(tmp)
+        model = AutoModel.from_pretrained(model_name).eval()
+        dummy = tokenizer(["export"], return_tensors="pt")
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in INPUT_NAMES),
+            str(tmp / fp32_path.name),
+            input_names=INPUT_NAMES,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES + ["last_hidden_state"]},
+            opset_version=14
+        )
+        for f in sorted(tmp.iterdir(), key=lambda f: f.name == fp32_path.name):
+            os.replace(f, model_dir / f.name)
+        shutil.rmtree(tmp, ignore_errors=True)
+    if quantize and not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp = int8_path.with_name(f"{int8_path.stem}.tmp{os.getpid()}.onnx")
+        quantize_dynamic(str(fp32_path), str(tmp), weight_type=QuantType.QInt8)
+        os.replace(tmp, int8_path)
+    return int8_path if quantize else fp32_path
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_name, cache_dir="onnx_models", quantize=False, batch_size=32, max_length=256):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        self.model_name = model_name
+        self.batch_size = batch_size
+        model_dir = Path(cache_dir) / model_name.replace("/", "__")
+        model_path = export_onnx(model_name, model_dir, quantize)
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+        self.session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+
+    def _embed(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.asarray([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.asarray([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.asarray([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, feeds)[0]
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts):
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed([text])[0].tolist()
+
+def compare_with_reference(onnx_embeddings, reference, texts):
+    # Cosine similarity between ONNX and reference vectors for the same texts
+    a = np.asarray(onnx_embeddings.embed_documents(texts), dtype=np.float32)
+    b = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+SAMPLE_TEXTS = [
+    "What is a SIP?",
+    "ELSS tax limit",
+    "How can I save more each month?",
+    "A mutual fund pools money from many investors to buy a diversified portfolio of securities.",
+    "Q: Should I pay off my credit card or invest?\nA: Paying off high-interest debt is usually the better return.",
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export MiniLM to ONNX and check it against HuggingFaceEmbeddings.")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    cosines = compare_with_reference(
+        OnnxEmbeddings(args.model, quantize=args.int8),
+        HuggingFaceEmbeddings(model_name=args.model),
+        SAMPLE_TEXTS
+    )
+    print(f"cosine vs HuggingFaceEmbeddings: min {cosines.min():.5f}, mean {cosines.mean():.5f}")
+    if cosines.min() < args.min_cosine:
+        raise SystemExit(f"ONNX embeddings diverge from the reference (min cosine < {args.min_cosine})")
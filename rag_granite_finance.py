@@ -1,177 +1,429 @@
-import streamlit as st
-from pathlib import Path
-from datasets import load_dataset
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-import torch, io, csv, os
-from streamlit_mic_recorder import mic_recorder
-import speech_recognition as sr
-
-HISTORY_FILE = "search_history.csv"
-
-# ----------------------------- Save & Load History -----------------------------
-def load_history_from_csv():
-    history = []
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) >= 2:  # Only Q and A
-                    q = row[0]
-                    a = row[1]
-                    history.append((q, a))
-    return history
-
-def save_history_to_csv(history):
-    with open(HISTORY_FILE, "w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        for q, a in history:
-            writer.writerow([q, a])
-
-def main():
-    if "voice_text" not in st.session_state:
-        st.session_state.voice_text = ""
-    if "history" not in st.session_state:
-        st.session_state.history = load_history_from_csv()  # Load persisted history
-    if "selected_history" not in st.session_state:
-        st.session_state.selected_history = None
-
-    INDEX_DIR = "faiss_index"
-    EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
-    GRANITE_MODEL = "ibm-granite/granite-3.3-2b-instruct"
-    CHUNK_SIZE = 500
-    CHUNK_OVERLAP = 50
-    TOP_K = 2
-
-    @st.cache_resource
-    def build_or_load_faiss():
-        if Path(INDEX_DIR).exists():
-            embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-            return FAISS.load_local(INDEX_DIR, embeddings, allow_dangerous_deserialization=True)
-
-        hf_datasets = [
-            "SALT-NLP/FLUE-FiQA",
-            "sujet-ai/Sujet-Finance-Instruct-177k",
-            "bilalRahib/fiqa-personal-finance-dataset" 
-        ]
-        all_texts = []
-        for ds_name in hf_datasets:
-            ds = load_dataset(ds_name)
-            train = ds["train"]
-            cols = train.column_names
-            if "text" in cols:
-                all_texts.extend(train["text"])
-            elif "sentence" in cols:
-                all_texts.extend(train["sentence"])
-            elif "question" in cols and "answer" in cols:
-                all_texts.extend([f"Q: {q}\nA: {a}" for q, a in zip(train["question"], train["answer"])])
-            else:
-                all_texts.extend(train[cols[0]])
-
-        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-        chunks = []
-        for txt in all_texts:
-            chunks.extend(splitter.split_text(str(txt)))
-
-        embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-        vectorstore = FAISS.from_texts(chunks, embeddings)
-        vectorstore.save_local(INDEX_DIR)
-        return vectorstore
-
-    @st.cache_resource
-    def load_granite_llm():
-        tokenizer = AutoTokenizer.from_pretrained(GRANITE_MODEL)
-        if torch.cuda.is_available():
-            model = AutoModelForCausalLM.from_pretrained(
-                GRANITE_MODEL,
-                torch_dtype=torch.float16,
-                device_map=None
-            )
-            model=model.to("cuda")
-        else:
-            model = AutoModelForCausalLM.from_pretrained(
-                GRANITE_MODEL,
-                torch_dtype=torch.float32,
-                device_map={"": "cpu"}
-            )
-        return pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer,
-            max_new_tokens=256,
-            temperature=0.2,
-            do_sample=False
-        )
-
-    def answer_question(granite_pipe, vectorstore, question):
-        docs = vectorstore.similarity_search(question, k=TOP_K)
-        context = "\n\n---\n\n".join([d.page_content for d in docs]) or "No relevant context found."
-        prompt = (
-            f"You are a financial assistant. "
-            f"Use ONLY the context below to answer the question.\n\n"
-            f"Context:\n{context}\n\n"
-            f"Question: {question}\nAnswer:"
-        )
-        output = granite_pipe(prompt, max_new_tokens=256, temperature=0.2, do_sample=False, return_full_text=False)
-        answer = output[0]['generated_text'].strip()
-        return answer, [d.page_content for d in docs]
-
-    st.set_page_config(page_title="Finance Chatbot", layout="wide")
-    st.title("💬 Finance Chatbot (IBM Granite )")
-
-    # Sidebar: Show persisted history
-    st.sidebar.header("📜 Search History")
-    if st.session_state.history:
-        for idx, (q, a) in enumerate(st.session_state.history):
-            if st.sidebar.button(q[:30] + ("..." if len(q) > 30 else ""), key=f"hist_{idx}"):
-                st.session_state.selected_history = (q, a, [])
-    else:
-        st.sidebar.write("No searches yet.")
-
-    vectorstore = build_or_load_faiss()
-    granite_pipe = load_granite_llm()
-
-    st.markdown("#### 🎙 Speak your query:")
-    audio_data = mic_recorder(
-        start_prompt="🎙 Start Recording",
-        stop_prompt="⏹ Stop Recording",
-        just_once=True,
-        use_container_width=True,
-        format="wav"
-    )
-
-    if audio_data:
-        try:
-            wav_bytes = io.BytesIO(audio_data["bytes"])
-            recognizer = sr.Recognizer()
-            with sr.AudioFile(wav_bytes) as source:
-                audio = recognizer.record(source)
-            text = recognizer.recognize_google(audio)
-            st.session_state.voice_text = text
-            st.success(f"Recognized Speech: {text}")
-        except Exception as e:
-            st.error(f"Speech recognition error: {e}")
-
-    user_question = st.text_input("Ask your finance question:", placeholder="Ask Fibot?", value=st.session_state.voice_text)
-
-    if user_question.strip() and (not st.session_state.history or st.session_state.history[-1][0] != user_question):
-        with st.spinner("Generating answer..."):
-            answer, sources = answer_question(granite_pipe, vectorstore, user_question)
-        st.session_state.history.append((user_question, answer))
-        save_history_to_csv(st.session_state.history)  # Persist immediately
-        st.session_state.selected_history = (user_question, answer, sources)
-        st.session_state.voice_text = ""
-
-    if st.session_state.selected_history:
-        q, a, src = st.session_state.selected_history
-        st.subheader(f"🔍 {q}")
-        st.write(a)
-        if src:
-            with st.expander("Sources"):
-                for i, s in enumerate(src, 1):
-                    st.write(f"{i}. {s[:300]}...")
-
-if __name__ == "__main__":
-    main()
+import streamlit as st
+import io, os, logging, time
+from streamlit_mic_recorder import mic_recorder
+import speech_recognition as sr
+import index_builder
+import index_manager
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from embedding_pool import ParallelEmbeddings
+from dedup import ChunkDeduplicator
+from answer_cache import AnswerCache
+import context_builder
+from hybrid_retrieval import HybridRetriever
+from generation_scheduler import GenerationScheduler
+from startup_timeline import TIMELINE
+from history_store import HistoryStore
+from history_search import HistoryIndex
+
+HISTORY_FILE = "search_history.csv"  # legacy format, imported into HISTORY_DB once
+logger = logging.getLogger(__name__)
+
+# ----------------------------- Save & Load History -----------------------------
+HISTORY_DB = os.getenv("FIBOT_HISTORY_DB", "search_history.sqlite")
+HISTORY_PAGE_SIZE = int(os.getenv("FIBOT_HISTORY_PAGE_SIZE", "50"))
+
+@st.cache_resource
+def load_history_store():
+    return HistoryStore(HISTORY_DB, legacy_csv=HISTORY_FILE)
+
+@st.cache_resource
+def load_history_index():
+    return HistoryIndex(load_history_store())
+
+def reset_history_page():
+    st.session_state.history_page = 0
+
+def render_history_sidebar(history, history_index):
+    # One page of buttons per rerun, whatever the history size; the search box filters through the inverted index
+    st.sidebar.header("📜 Search History")
+    history_index.refresh()
+    query = st.sidebar.text_input("Search history", key="history_query", on_change=reset_history_page)
+    page = st.session_state.get("history_page", 0)
+    start = time.perf_counter()
+    total, entries = history_index.search(query, page, HISTORY_PAGE_SIZE)
+    if query.strip():
+        st.sidebar.caption(f"{total} matches in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if not entries:
+        st.sidebar.write("No matching searches." if query.strip() else "No searches yet.")
+        return
+    for entry_id, q in entries:
+        if st.sidebar.button(q[:30] + ("..." if len(q) > 30 else ""), key=f"hist_{entry_id}"):
+            entry = history.get(entry_id)
+            st.session_state.selected_history = (entry["question"], entry["answer"], entry["sources"])
+    pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    if pages > 1:
+        prev_col, label_col, next_col = st.sidebar.columns([1, 2, 1])
+        if prev_col.button("◀", key="history_prev", disabled=page == 0):
+            st.session_state.history_page = page - 1
+            st.rerun()
+        label_col.caption(f"Page {page + 1} of {pages}")
+        if next_col.button("▶", key="history_next", disabled=page >= pages - 1):
+            st.session_state.history_page = page + 1
+            st.rerun()
+
+# ----------------------------- Configuration -----------------------------
+INDEX_DIR = os.getenv("FIBOT_INDEX_DIR", "faiss_index")
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_BACKEND = os.getenv("FIBOT_EMBED_BACKEND", "torch")  # torch | onnx | onnx-int8
+GRANITE_MODEL = "ibm-granite/granite-3.3-2b-instruct"
+LLM_BACKEND = os.getenv("FIBOT_LLM_BACKEND", "fp32")  # CPU weights: fp32 | bf16 | int8 (dynamic quantization)
+# Memory-map Granite from a safetensors export in this directory so replicas on one host share the weights
+# (fp32/bf16 only; exported on first use). Empty = each process loads a private copy.
+SHARED_WEIGHTS_DIR = os.getenv("FIBOT_SHARED_WEIGHTS_DIR", "")
+# Optional draft model for assisted generation; must share Granite's tokenizer, e.g. ibm-granite/granite-3.0-1b-a400m-instruct
+DRAFT_MODEL = os.getenv("FIBOT_DRAFT_MODEL", "")
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+TOP_K = int(os.getenv("FIBOT_TOP_K", "4"))  # upper bound; chunks below the similarity floor or over budget are dropped
+CONTEXT_CANDIDATES = int(os.getenv("FIBOT_CONTEXT_CANDIDATES", "20"))  # nearest chunks considered per query
+CONTEXT_MIN_SIMILARITY = float(os.getenv("FIBOT_CONTEXT_MIN_SIMILARITY", "0.35"))  # cosine floor
+CONTEXT_MMR_LAMBDA = float(os.getenv("FIBOT_CONTEXT_MMR_LAMBDA", "0.7"))  # 1.0 = relevance only, lower = more diverse
+CONTEXT_TOKEN_BUDGET = int(os.getenv("FIBOT_CONTEXT_TOKEN_BUDGET", "384"))  # Granite tokens of context per prompt
+HYBRID_RETRIEVAL = os.getenv("FIBOT_HYBRID", "1") == "1"  # fuse BM25 with dense results
+LEXICAL_FAST_PATH_MAX_TERMS = int(os.getenv("FIBOT_LEXICAL_MAX_TERMS", "3"))  # 0 disables the embedding-free path
+LEXICAL_FAST_PATH_MIN_SCORE = float(os.getenv("FIBOT_LEXICAL_MIN_SCORE", "8.0"))  # BM25 score of the top hit
+RRF_K = int(os.getenv("FIBOT_RRF_K", "60"))
+BUILD_BATCH_SIZE = int(os.getenv("FIBOT_BUILD_BATCH_SIZE", "256"))  # chunks embedded and added per shard
+BUILD_CHECKPOINT_EVERY = int(os.getenv("FIBOT_BUILD_CHECKPOINT_EVERY", "20"))  # shards between checkpoints
+EMBED_CACHE_DIR = os.getenv("FIBOT_EMBED_CACHE_DIR", "embedding_cache")  # survives deleting INDEX_DIR
+EMBED_WORKERS = int(os.getenv("FIBOT_EMBED_WORKERS", "0"))  # 0 = embed in-process during index builds
+EMBED_THREADS_PER_WORKER = int(os.getenv("FIBOT_EMBED_THREADS_PER_WORKER", "0")) or None  # default: cores / workers
+EMBED_BATCH_SIZE = int(os.getenv("FIBOT_EMBED_BATCH_SIZE", "32"))
+INDEX_TYPE = os.getenv("FIBOT_INDEX_TYPE", "flat")  # flat (exact) | ivfpq | hnsw
+IVF_NLIST = int(os.getenv("FIBOT_IVF_NLIST", "1024"))
+PQ_M = int(os.getenv("FIBOT_PQ_M", "48"))
+HNSW_M = int(os.getenv("FIBOT_HNSW_M", "32"))
+INDEX_TRAIN_SIZE = int(os.getenv("FIBOT_INDEX_TRAIN_SIZE", "50000"))  # vectors buffered to train IVF-PQ
+INDEX_NPROBE = int(os.getenv("FIBOT_NPROBE", "16"))
+INDEX_EF_SEARCH = int(os.getenv("FIBOT_EF_SEARCH", "64"))
+INDEX_MMAP = os.getenv("FIBOT_INDEX_MMAP", "1") == "1"
+INDEX_POLL_SECONDS = int(os.getenv("FIBOT_INDEX_POLL_SECONDS", "60"))  # check INDEX_DIR/CURRENT for new versions; 0 = off
+INDEX_KEEP_VERSIONS = int(os.getenv("FIBOT_INDEX_KEEP_VERSIONS", "2"))
+INDEX_ADMIN = os.getenv("FIBOT_INDEX_ADMIN", "0") == "1"  # show the background rebuild button in the sidebar
+DEDUP_CHUNKS = os.getenv("FIBOT_DEDUP", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("FIBOT_DEDUP_THRESHOLD", "0.8"))  # estimated Jaccard for near-duplicates
+ANSWER_CACHE_DB = os.getenv("FIBOT_ANSWER_CACHE_DB", "answer_cache.sqlite")
+ANSWER_CACHE_SIZE = int(os.getenv("FIBOT_ANSWER_CACHE_SIZE", "500"))
+ANSWER_CACHE_TTL = int(os.getenv("FIBOT_ANSWER_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+ANSWER_CACHE_THRESHOLD = float(os.getenv("FIBOT_ANSWER_CACHE_THRESHOLD", "0.92"))  # cosine for a near-duplicate hit
+STREAM_RESPONSES = os.getenv("FIBOT_STREAM", "1") == "1"  # render tokens as they are generated
+BATCH_GENERATION = os.getenv("FIBOT_BATCHING", "0") == "1"  # micro-batch concurrent sessions (disables streaming)
+BATCH_MAX_SIZE = int(os.getenv("FIBOT_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("FIBOT_BATCH_MAX_WAIT_MS", "50"))
+PREFIX_CACHE = os.getenv("FIBOT_PREFIX_CACHE", "1") == "1"  # reuse the KV cache of the fixed prompt preamble
+
+# ----------------------------- Vector Index -----------------------------
+def make_embeddings():
+    # Imported lazily so the ONNX backend never pulls in torch just to embed a question
+    if EMBED_BACKEND in ("onnx", "onnx-int8"):
+        from onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(EMBED_MODEL, quantize=EMBED_BACKEND == "onnx-int8", batch_size=EMBED_BATCH_SIZE)
+    if EMBED_BACKEND != "torch":
+        raise ValueError(f"Unknown embedding backend: {EMBED_BACKEND!r} (expected torch, onnx or onnx-int8)")
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+
+@st.cache_resource
+def load_query_embeddings():
+    # Shared by every index version, so a swap never reloads the embedder
+    with TIMELINE.stage("embedder"):
+        return make_embeddings()
+
+def open_index_version(path):
+    vectorstore = index_builder.load_index(
+        path,
+        load_query_embeddings(),
+        mmap=INDEX_MMAP,
+        nprobe=INDEX_NPROBE,
+        ef_search=INDEX_EF_SEARCH
+    )
+    retriever = None
+    if HYBRID_RETRIEVAL:
+        retriever = HybridRetriever(
+            vectorstore.docstore,
+            candidates=CONTEXT_CANDIDATES,
+            rrf_k=RRF_K,
+            fast_path_max_terms=LEXICAL_FAST_PATH_MAX_TERMS,
+            fast_path_min_score=LEXICAL_FAST_PATH_MIN_SCORE
+        )
+    return vectorstore, retriever
+
+def build_index_version(path):
+    # Streams rows -> chunks -> embeddings -> index in shards, checkpointing to path so a killed build resumes.
+    # Chunk embeddings are reused from EMBED_CACHE_DIR, so a rebuild only pays for chunks it has never seen.
+    embeddings = load_query_embeddings()
+    embedder = embeddings
+    cache_name = EMBED_MODEL if EMBED_BACKEND == "torch" else f"{EMBED_MODEL}@{EMBED_BACKEND}"
+    if EMBED_WORKERS > 0:
+        embedder = ParallelEmbeddings(EMBED_MODEL, EMBED_WORKERS, EMBED_THREADS_PER_WORKER, EMBED_BATCH_SIZE)
+        cache_name = EMBED_MODEL
+    cached = CachedEmbeddings(embedder, EmbeddingCache(EMBED_CACHE_DIR, cache_name))
+    try:
+        index_builder.build_index(
+            path,
+            cached,
+            CHUNK_SIZE,
+            CHUNK_OVERLAP,
+            batch_size=BUILD_BATCH_SIZE,
+            checkpoint_every=BUILD_CHECKPOINT_EVERY,
+            index_factory=index_builder.index_factory_string(INDEX_TYPE, IVF_NLIST, PQ_M, HNSW_M),
+            train_size=INDEX_TRAIN_SIZE,
+            deduplicator=ChunkDeduplicator(threshold=DEDUP_THRESHOLD) if DEDUP_CHUNKS else None
+        )
+    finally:
+        if embedder is not embeddings:
+            logger.info(embedder.report())
+            embedder.close()
+    logger.info("Embedding cache: %d hits, %d misses", cached.hits, cached.misses)
+
+@st.cache_resource
+def load_live_index():
+    # Only a server with no index at all builds on the request path; later rebuilds run in the background
+    load_query_embeddings()  # loaded first so the "index" stage times only the index itself
+    with TIMELINE.stage("index"):
+        return index_manager.LiveIndex(
+            INDEX_DIR,
+            open_index_version,
+            build_index_version,
+            poll_seconds=INDEX_POLL_SECONDS,
+            keep_versions=INDEX_KEEP_VERSIONS
+        )
+
+def build_or_load_faiss():
+    return load_live_index().snapshot()[0]
+
+# ----------------------------- Granite LLM -----------------------------
+# granite_llm (torch + transformers) is imported inside the functions that generate, so the embedding
+# path alone (e.g. rebuild_index.py with FIBOT_EMBED_BACKEND=onnx) never imports torch.
+@st.cache_resource
+def load_granite_llm():
+    import granite_llm
+    return granite_llm.load_pipeline(GRANITE_MODEL, LLM_BACKEND, SHARED_WEIGHTS_DIR or None)
+
+@st.cache_resource
+def load_prefix_cache():
+    # Prefill of the static instruction preamble, computed once per server and copied into every request
+    import granite_llm
+    granite_pipe = load_granite_llm()
+    with TIMELINE.stage("prefix cache"):
+        return granite_llm.PrefixCache(granite_pipe, granite_llm.PROMPT_PREAMBLE)
+
+@st.cache_resource
+def load_draft_model():
+    import granite_llm
+    return granite_llm.DraftModel(DRAFT_MODEL, load_granite_llm().model)
+
+@st.cache_resource
+def load_generation_scheduler():
+    # One scheduler per server: every session's prompts are queued and batched onto the shared pipeline
+    import granite_llm
+    granite_pipe = load_granite_llm()
+    return GenerationScheduler(
+        lambda prompts: granite_llm.generate_batch(granite_pipe, prompts),
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS
+    )
+
+# ----------------------------- Answer Cache -----------------------------
+@st.cache_resource
+def load_answer_cache():
+    return AnswerCache(
+        ANSWER_CACHE_DB,
+        max_entries=ANSWER_CACHE_SIZE,
+        ttl_seconds=ANSWER_CACHE_TTL,
+        threshold=ANSWER_CACHE_THRESHOLD
+    )
+
+# ----------------------------- Question Answering -----------------------------
+def answer_question(granite_pipe, vectorstore, question, answer_cache=None, on_text=None, scheduler=None, prefix_cache=None, draft=None, retriever=None, speculation=None):
+    # speculation: optional dict filled with this answer's draft-model report
+    import granite_llm
+    if answer_cache is not None:
+        cached = answer_cache.get_exact(question)
+        if cached is not None:
+            return cached
+    count_tokens = lambda text: len(granite_pipe.tokenizer(text, add_special_tokens=False).input_ids)
+    start = time.perf_counter()
+    lexical_ids = retriever.confident_lexical(question) if retriever is not None else None
+    if lexical_ids is not None:
+        # Confident keyword match: answer from BM25 hits without running the embedder
+        query_vector = None
+        if answer_cache is not None:
+            answer_cache.record_miss()
+        chunks = context_builder.pack_in_order(
+            vectorstore, lexical_ids, count_tokens, token_budget=CONTEXT_TOKEN_BUDGET, max_chunks=TOP_K
+        )
+        retriever.stats.record("lexical", time.perf_counter() - start)
+    else:
+        # Embed once: the same vector serves the near-duplicate cache lookup and the FAISS search
+        query_vector = vectorstore.embedding_function.embed_query(question)
+        if answer_cache is not None:
+            cached = answer_cache.get_similar(query_vector)
+            if cached is not None:
+                return cached
+        candidate_ids = context_builder.dense_candidates(vectorstore, query_vector, CONTEXT_CANDIDATES)
+        if retriever is not None:
+            candidate_ids = retriever.fuse(question, candidate_ids)
+        chunks = context_builder.build_context(
+            vectorstore,
+            query_vector,
+            count_tokens=count_tokens,
+            min_similarity=CONTEXT_MIN_SIMILARITY,
+            mmr_lambda=CONTEXT_MMR_LAMBDA,
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            max_chunks=TOP_K,
+            candidate_ids=candidate_ids
+        )
+        if retriever is not None:
+            retriever.stats.record("hybrid", time.perf_counter() - start)
+    sources = [text for text, _ in chunks]
+    context = "\n\n---\n\n".join(sources) or "No relevant context found."
+    prompt = (
+        granite_llm.PROMPT_PREAMBLE +
+        f"{context}\n\n"
+        f"Question: {question}\nAnswer:"
+    )
+    if scheduler is not None:
+        answer = scheduler.generate(prompt)
+    elif on_text is None:
+        answer = granite_llm.generate_answer(granite_pipe, prompt, prefix_cache, draft, speculation)
+    else:
+        # on_text receives the answer so far after every streamed piece
+        parts = []
+        gen_start = time.perf_counter()
+        for piece in granite_llm.stream_answer(granite_pipe, prompt, prefix_cache, draft, speculation):
+            if not parts:
+                TIMELINE.record_once("first token", gen_start)
+            parts.append(piece)
+            on_text("".join(parts))
+        answer = "".join(parts).strip()
+    if answer_cache is not None:
+        answer_cache.put(question, query_vector, answer, sources)
+    return answer, sources
+
+# ----------------------------- Warm-up -----------------------------
+WARMUP_QUESTION = "What is a SIP?"
+
+def warm_up():
+    # Runs on main.py's warm-up thread: the cached loaders are filled before anyone opens the chatbot
+    import granite_llm
+    vectorstore, _ = load_live_index().snapshot()
+    with TIMELINE.stage("embedder warm-up"):
+        vectorstore.embedding_function.embed_query(WARMUP_QUESTION)
+    granite_pipe = load_granite_llm()
+    prefix_cache = load_prefix_cache() if PREFIX_CACHE else None
+    if DRAFT_MODEL:
+        load_draft_model()
+    load_answer_cache()
+    prompt = granite_llm.PROMPT_PREAMBLE + f"No relevant context found.\n\nQuestion: {WARMUP_QUESTION}\nAnswer:"
+    start, end = granite_llm.warm_up(granite_pipe, prompt, prefix_cache)
+    TIMELINE.record_once("first token", start, end)
+
+def main():
+    if "voice_text" not in st.session_state:
+        st.session_state.voice_text = ""
+    history = load_history_store()
+    if "last_question" not in st.session_state:
+        last = history.last()
+        st.session_state.last_question = last["question"] if last else None
+    if "selected_history" not in st.session_state:
+        st.session_state.selected_history = None
+
+    st.set_page_config(page_title="Finance Chatbot", layout="wide")
+    st.title("💬 Finance Chatbot (IBM Granite )")
+
+    # Sidebar: Show persisted history
+    render_history_sidebar(history, load_history_index())
+
+    live_index = load_live_index()
+    vectorstore, retriever = live_index.snapshot()  # fixed for this run even if a new version is swapped in
+    granite_pipe = load_granite_llm()
+    answer_cache = load_answer_cache()
+    scheduler = load_generation_scheduler() if BATCH_GENERATION else None
+    prefix_cache = load_prefix_cache() if PREFIX_CACHE else None
+    draft = load_draft_model() if DRAFT_MODEL else None
+    st.sidebar.caption(f"Index version: {live_index.version} ({live_index.status})")
+    if live_index.error:
+        st.sidebar.caption(f"Last rebuild failed: {live_index.error}")
+    if INDEX_ADMIN and st.sidebar.button("🔄 Rebuild index", disabled=live_index.status == "building"):
+        live_index.rebuild_async()
+    if retriever is not None:
+        for path, latency in retriever.stats.summary().items():
+            st.sidebar.caption(
+                f"Retrieval ({path}): {latency['count']} queries · "
+                f"{latency['mean_ms']:.0f} ms mean · {latency['p95_ms']:.0f} ms p95"
+            )
+    speculation_caption = st.sidebar.empty()
+    cache_stats = answer_cache.stats()
+    st.sidebar.caption(
+        f"Answer cache: {cache_stats['entries']} entries · "
+        f"{cache_stats['exact_hits']} exact / {cache_stats['similar_hits']} similar hits · "
+        f"{cache_stats['misses']} misses"
+    )
+
+    st.markdown("#### 🎙 Speak your query:")
+    audio_data = mic_recorder(
+        start_prompt="🎙 Start Recording",
+        stop_prompt="⏹ Stop Recording",
+        just_once=True,
+        use_container_width=True,
+        format="wav"
+    )
+
+    if audio_data:
+        try:
+            wav_bytes = io.BytesIO(audio_data["bytes"])
+            recognizer = sr.Recognizer()
+            with sr.AudioFile(wav_bytes) as source:
+                audio = recognizer.record(source)
+            text = recognizer.recognize_google(audio)
+            st.session_state.voice_text = text
+            st.success(f"Recognized Speech: {text}")
+        except Exception as e:
+            st.error(f"Speech recognition error: {e}")
+
+    user_question = st.text_input("Ask your finance question:", placeholder="Ask Fibot?", value=st.session_state.voice_text)
+
+    if user_question.strip() and st.session_state.last_question != user_question:
+        spec = {}  # this answer's own speculative-decoding numbers
+        if STREAM_RESPONSES and scheduler is None:
+            live = st.empty()
+            with live.container():
+                st.subheader(f"🔍 {user_question}")
+                live_answer = st.empty()
+            answer, sources = answer_question(
+                granite_pipe, vectorstore, user_question, answer_cache,
+                on_text=live_answer.markdown, prefix_cache=prefix_cache, draft=draft, retriever=retriever,
+                speculation=spec
+            )
+            live.empty()  # the finished answer is rendered below together with its sources
+        else:
+            with st.spinner("Generating answer..."):
+                answer, sources = answer_question(
+                    granite_pipe, vectorstore, user_question, answer_cache,
+                    scheduler=scheduler, prefix_cache=prefix_cache, draft=draft, retriever=retriever,
+                    speculation=spec
+                )
+        history.append(user_question, answer, sources)  # Persist immediately
+        st.session_state.last_question = user_question
+        st.session_state.selected_history = (user_question, answer, sources)
+        st.session_state.voice_text = ""
+        if spec:
+            logger.info("Speculative decoding: %s", spec)
+            speculation_caption.caption(
+                f"Draft model: {100 * spec['acceptance_rate']:.0f}% of drafted tokens accepted · "
+                f"{spec['tokens_per_step']:.1f} tokens per Granite step · "
+                f"{spec['new_tokens']} tokens in {spec['seconds']:.1f} s ({spec['tokens_per_second']:.1f} tok/s)"
+            )
+
+    if st.session_state.selected_history:
+        q, a, src = st.session_state.selected_history
+        st.subheader(f"🔍 {q}")
+        st.write(a)
+        if src:
+            with st.expander("Sources"):
+                for i, s in enumerate(src, 1):
+                    st.write(f"{i}. {s[:300]}...")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# Builds a new index version next to the one being served and publishes it by swapping INDEX_DIR/CURRENT.
+# Running chatbot servers keep answering from the old version and switch over on their next poll
+# (FIBOT_INDEX_POLL_SECONDS); no restart is needed. Uses the same FIBOT_* settings as the app, e.g.
+#   FIBOT_INDEX_TYPE=ivfpq python rebuild_index.py
+import argparse
+import logging
+import index_manager
+import rag_granite_finance as app
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and publish a new FAISS index version.")
+    parser.add_argument("--index-dir", default=app.INDEX_DIR)
+    parser.add_argument("--keep", type=int, default=app.INDEX_KEEP_VERSIONS)
+    parser.add_argument("--no-publish", action="store_true", help="build only; publish later with --publish VERSION")
+    parser.add_argument("--publish", metavar="VERSION", help="publish an already built version (also rolls back)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.publish:
+        index_manager.publish(args.index_dir, args.publish)
+        return
+    with index_manager.claim_version(args.index_dir) as (version, path):
+        app.build_index_version(path)
+    print(f"Built index version {version} in {path}")
+    if not args.no_publish:
+        index_manager.publish(args.index_dir, version)
+        index_manager.prune(args.index_dir, args.keep)
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,14 @@ import google.generativeai as genai
 import io
 import os
 from dotenv import load_dotenv
+import json
+import spending_trends
+from transaction_store import TransactionStore
+
+@st.cache_resource
+def load_transaction_store():
+    return TransactionStore()
+
 def main():
     # ---------- CONFIG ----------
     st.set_page_config(page_title="Spending Insights", page_icon="📊", layout="wide")
@@ -33,13 +41,8 @@ def main():
     </style>
     """, unsafe_allow_html=True)
 
-    # ---- Load or Initialize Transaction Storage ----
-    HISTORY_FILE = "transactions_history.csv"
-
-    if os.path.exists(HISTORY_FILE):
-        history_df = pd.read_csv(HISTORY_FILE)
-    else:
-        history_df = pd.DataFrame(columns=["date", "category", "amount"])
+    # ---- Transaction Storage (history is read only when a section below needs it) ----
+    store = load_transaction_store()
 
     if "transactions" not in st.session_state:
         st.session_state.transactions = []
@@ -74,9 +77,8 @@ def main():
             }
             st.session_state.transactions.append(new_entry)
 
-            # Save to CSV for persistence
-            df_all = pd.DataFrame(st.session_state.transactions)
-            df_all.to_csv(HISTORY_FILE, index=False)
+            # Persist: one appended row, earlier history is left untouched
+            store.append(t_date, t_category, t_amount)
 
             st.success(f"Transaction added — {t_category} | ₹{t_amount} | {t_date}")
     st.markdown('</div>', unsafe_allow_html=True)
@@ -93,7 +95,18 @@ def main():
     if st.checkbox("📜 Show Full Transaction History"):
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
         st.subheader("📊 Full Transaction History")
-        st.dataframe(history_df, use_container_width=True)
+        bounds = store.date_range()
+        if bounds is None:
+            st.write("No transactions saved yet.")
+        else:
+            period = st.date_input("Period", value=bounds, min_value=bounds[0], max_value=bounds[1])
+            start, end = period if len(period) == 2 else (period[0], period[0])
+            st.dataframe(store.read(start, end), use_container_width=True)
+            st.subheader("🗓️ Monthly Totals by Category")
+            monthly = store.rollups(f"{start:%Y-%m}", f"{end:%Y-%m}").pivot_table(
+                index="month", columns="category", values="total", aggfunc="sum", observed=True, fill_value=0
+            )
+            st.bar_chart(monthly)
         st.markdown('</div>', unsafe_allow_html=True)
 
     # ---- AI Insights Section ----
@@ -123,11 +136,17 @@ def main():
 
             st.subheader("📌 Category-wise Spending Breakdown")
             st.image(buf,width=400) 
-            # --- 2. AI Insights for Trends & Spikes (Using Full History) ---
+            # --- 2. AI Insights for Trends & Spikes (statistics computed locally from the monthly rollups) ---
+            summary = spending_trends.summarize(spending_trends.monthly_from_rollups(store.rollups()))
+            with st.expander("📐 Statistics sent to Fibot AI"):
+                st.json(summary)
             prompt = f"""
             You are a personal finance assistant used in India.
-            Analyze the following ENTIRE spending history:
-            {history_df.to_dict(orient='records')}
+            Below is a statistical summary of the user's ENTIRE spending history, in ₹:
+            monthly totals, the latest month per category, change vs the previous month,
+            per-category trend slopes over recent months, and detected spikes
+            (months far above the category's usual trailing average; z = standard deviations above it).
+            {json.dumps(summary)}
 
             Provide:
             1. Trends compared to previous month (assume missing data if not provided)
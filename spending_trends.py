@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Month-over-month trends and spending spikes computed locally, vectorized over a month x category matrix,
+# so the insights prompt carries a fixed-size statistical summary instead of the whole transaction history.
+#   spike: a month whose total is z_threshold standard deviations above that category's trailing
+#          `window`-month rolling mean (the month itself is excluded from its own baseline)
+#   trend: least-squares slope of each category's monthly totals over the last `trend_months` months
+
+def monthly_from_rollups(rollups):
+    # rollups: TransactionStore.rollups() frame (month "YYYY-MM", category, total, ...)
+    if rollups.empty:
+        return pd.DataFrame(dtype=float)
+    matrix = rollups.pivot_table(index="month", columns="category", values="total", aggfunc="sum", observed=True)
+    matrix.index = pd.PeriodIndex(matrix.index, freq="M")
+    return _fill_months(matrix)
+
+def monthly_from_transactions(transactions):
+    # transactions: date, category, amount rows (e.g. TransactionStore.read())
+    if transactions.empty:
+        return pd.DataFrame(dtype=float)
+    month = transactions["date"].dt.to_period("M")
+    matrix = transactions.groupby([month, "category"], observed=True)["amount"].sum().unstack("category")
+    return _fill_months(matrix)
+
+def _fill_months(matrix):
+    # A month without spending in a category counts as 0, including months with no transactions at all
+    months = pd.period_range(matrix.index.min(), matrix.index.max(), freq="M")
+    matrix = matrix.reindex(months).fillna(0.0)
+    matrix.columns = matrix.columns.astype(str)
+    return matrix
+
+def spikes(monthly, window=3, z_threshold=2.0, min_history=2, min_std_fraction=0.1):
+    values = monthly.to_numpy(dtype=float)
+    baseline = monthly.shift(1).rolling(window, min_periods=min_history)
+    mean = baseline.mean().to_numpy()
+    # The std is floored at a fraction of the mean so a perfectly steady category doesn't turn every
+    # small change into an infinite z-score; a category with no baseline spending is never a spike
+    std = np.fmax(baseline.std(ddof=0).to_numpy(), min_std_fraction * mean)
+    z = np.full_like(values, np.nan)
+    np.divide(values - mean, std, out=z, where=std > 0)
+    months, categories = np.nonzero(np.nan_to_num(z, nan=-np.inf) >= z_threshold)
+    found = pd.DataFrame({
+        "month": monthly.index[months].astype(str),
+        "category": monthly.columns[categories],
+        "amount": values[months, categories],
+        "baseline": mean[months, categories],
+        "z": z[months, categories]
+    })
+    return found.sort_values("z", ascending=False, ignore_index=True)
+
+def trends(monthly, trend_months=6):
+    y = monthly.iloc[-trend_months:].to_numpy(dtype=float)
+    mean = y.mean(axis=0)
+    if len(y) < 2:
+        slope = np.zeros(y.shape[1])
+    else:
+        # Closed-form least squares, one slope per column
+        x = np.arange(len(y), dtype=float)
+        x -= x.mean()
+        slope = x @ (y - mean) / (x @ x)
+    pct = np.zeros_like(slope)
+    np.divide(100 * slope, mean, out=pct, where=mean > 0)
+    return pd.DataFrame({"slope_per_month": slope, "slope_pct_of_mean": pct}, index=monthly.columns)
+
+def summarize(monthly, window=3, z_threshold=2.0, trend_months=6, max_spikes=10, max_categories=12):
+    # Fixed-size summary (bounded by max_categories, trend_months and max_spikes) for the insights prompt
+    if monthly.empty:
+        return {"months": 0}
+    totals = monthly.sum(axis=1)
+    # Only the biggest categories of the trend window are itemized; the rest still count in the totals
+    top = monthly.iloc[-trend_months:].sum().nlargest(max_categories).index
+    last = monthly.iloc[-1][top]
+    summary = {
+        "months": len(monthly),
+        "period": f"{monthly.index[0]} to {monthly.index[-1]}",
+        "monthly_totals": {str(m): round(float(v), 2) for m, v in totals.iloc[-trend_months:].items()},
+        "latest_month": str(monthly.index[-1]),
+        "latest_by_category": {c: round(float(v), 2) for c, v in last.items()}
+    }
+    if len(monthly) > 1:
+        prev = monthly.iloc[-2][top].to_numpy()
+        change = last.to_numpy() - prev
+        pct = np.full_like(change, np.nan)
+        np.divide(100 * change, prev, out=pct, where=prev > 0)
+        summary["vs_previous_month"] = {
+            c: {"change": round(float(d), 2), "pct": None if np.isnan(p) else round(float(p), 1)}
+            for c, d, p in zip(top, change, pct)
+        }
+        prev_total = totals.iloc[-2]
+        summary["total_change_pct"] = round(float(100 * (totals.iloc[-1] - prev_total) / prev_total), 1) \
+            if prev_total > 0 else None
+    trend = trends(monthly, trend_months).loc[top]
+    summary["trend_per_month"] = {
+        c: {"slope": round(float(r.slope_per_month), 2), "pct_of_mean": round(float(r.slope_pct_of_mean), 1)}
+        for c, r in zip(trend.index, trend.itertuples())
+    }
+    summary["spikes"] = [
+        {"month": r.month, "category": r.category, "amount": round(float(r.amount), 2),
+         "usual": round(float(r.baseline), 2), "z": round(float(r.z), 1)}
+        for r in spikes(monthly, window, z_threshold).head(max_spikes).itertuples()
+    ]
+    return summary
@@ -0,0 +1,52 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Shared plumbing for the SQLite-backed stores (docstore, history, transactions, answer cache):
+# per-thread connections, BEGIN IMMEDIATE write transactions and PRAGMA user_version-gated migrations.
+
+class SQLiteStore:
+    # None = autocommit, with explicit BEGIN/COMMIT via write(); "" = sqlite3's implicit transactions + commit()
+    isolation_level = None
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._conn().execute("PRAGMA journal_mode=WAL")
+
+    def _conn(self):
+        # One connection per thread; Streamlit serves each session on its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=self.isolation_level)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def write(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue instead of failing mid-transaction
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def migrate(self, schema_version, upgrade):
+        # Runs upgrade(conn, from_version) once per database, even when several processes start together;
+        # returns whether this call did the upgrade
+        with self.write() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= schema_version:
+                return False
+            upgrade(conn, version)
+            conn.execute(f"PRAGMA user_version = {int(schema_version)}")
+        return True
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
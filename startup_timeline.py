@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Process-wide record of how long the expensive startup steps took (imports, tokenizer, weights, index,
+# first generated token) and when they ran relative to server start. Stages are recorded by whichever
+# thread performs them, the warm-up thread or the first request, and shown on the diagnostics page.
+
+class StartupTimeline:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages = []
+
+    def record(self, name, start, end=None):
+        end = time.perf_counter() if end is None else end
+        stage = {
+            "stage": name,
+            "offset_s": start - self.started,
+            "seconds": end - start,
+            "thread": threading.current_thread().name
+        }
+        with self.lock:
+            self.stages.append(stage)
+        logger.info("Startup: %s took %.2fs (at +%.2fs, %s)", name, stage["seconds"], stage["offset_s"], stage["thread"])
+
+    def record_once(self, name, start, end=None):
+        if not self.has(name):
+            self.record(name, start, end)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def has(self, name):
+        with self.lock:
+            return any(s["stage"] == name for s in self.stages)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.stages)
+
+TIMELINE = StartupTimeline()
+
+# ----------------------------- Warm-up -----------------------------
+_warmup = {"thread": None, "status": "off", "error": None}
+
+def start_warmup(target):
+    # Idempotent per process: Streamlit re-executes main.py on every interaction
+    with TIMELINE.lock:
+        if _warmup["thread"] is not None:
+            return False
+        _warmup["thread"] = threading.Thread(target=_run_warmup, args=(target,), name="warm-up", daemon=True)
+        _warmup["status"] = "running"
+    _warmup["thread"].start()
+    return True
+
+def _run_warmup(target):
+    start = time.perf_counter()
+    try:
+        target()
+        _warmup["status"] = "done"
+    except Exception as e:
+        logger.exception("Warm-up failed; models will load on the first request instead")
+        _warmup["status"] = "failed"
+        _warmup["error"] = str(e)
+    finally:
+        TIMELINE.record("warm-up total", start)
+
+def warmup_status():
+    return _warmup["status"], _warmup["error"]
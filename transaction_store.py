@@ -0,0 +1,225 @@
+import csv
+import logging
+import os
+import threading
+from datetime import date
+import numpy as np
+import pandas as pd
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Transactions in SQLite (WAL), shared by the Spending Insights and Budget Summary pages.
+#   transactions(day, category_id, amount)  one row per transaction, appended with a single INSERT
+#   categories(id, name)                    dictionary of category names; rows store the small integer code
+# day is an ISO date (enforced by a CHECK) with an index, so date-range reads only touch the rows in range.
+#   rollups(month, category_id, ...)        per month x category total/count/min/max, UPSERTed in the same
+#                                           transaction as each append, so aggregate reads never scan history
+# read() returns typed columns: date as datetime64, category as pandas Categorical, amount as float64.
+# The legacy transactions_history.csv is imported once, the first time the database is opened.
+
+DEFAULT_PATH = os.getenv("FIBOT_TRANSACTIONS_DB", "transactions.sqlite")
+LEGACY_CSV = "transactions_history.csv"
+SCHEMA_VERSION = 2  # 1: transactions + categories, 2: rollups
+ROLLUP_FIELDS = ["total", "count", "min_amount", "max_amount"]
+
+class TransactionStore(SQLiteStore):
+    def __init__(self, path=DEFAULT_PATH, legacy_csv=LEGACY_CSV):
+        super().__init__(path)
+        self.lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS transactions ("
+            "id INTEGER PRIMARY KEY, day TEXT NOT NULL CHECK (date(day) IS day), "
+            "category_id INTEGER NOT NULL REFERENCES categories(id), amount REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS transactions_day ON transactions(day)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rollups ("
+            "month TEXT NOT NULL, category_id INTEGER NOT NULL, total REAL NOT NULL, count INTEGER NOT NULL, "
+            "min_amount REAL NOT NULL, max_amount REAL NOT NULL, PRIMARY KEY (month, category_id)) WITHOUT ROWID"
+        )
+        self._reload_categories()
+        self._migrate(legacy_csv)
+
+    def _reload_categories(self):
+        # Categories created inside a rolled-back transaction no longer exist
+        with self.lock:
+            self.category_ids = dict(self._conn().execute("SELECT name, id FROM categories").fetchall())
+
+    def _category_id(self, conn, name):
+        category_id = self.category_ids.get(name)
+        if category_id is None:
+            conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+            category_id = conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()[0]
+            with self.lock:
+                self.category_ids[name] = category_id
+        return category_id
+
+    def _insert(self, conn, day, category, amount):
+        # Values are converted before the category is looked up, so bad input never creates a category row
+        day = pd.Timestamp(day).date().isoformat()
+        amount = float(amount)
+        category_id = self._category_id(conn, category)
+        conn.execute("INSERT INTO transactions (day, category_id, amount) VALUES (?, ?, ?)", (day, category_id, amount))
+        conn.execute(
+            "INSERT INTO rollups (month, category_id, total, count, min_amount, max_amount) VALUES (?, ?, ?, 1, ?, ?) "
+            "ON CONFLICT (month, category_id) DO UPDATE SET total = total + excluded.total, count = count + 1, "
+            "min_amount = MIN(min_amount, excluded.min_amount), max_amount = MAX(max_amount, excluded.max_amount)",
+            (day[:7], category_id, amount, amount, amount)
+        )
+
+    def _migrate(self, legacy_csv):
+        imported = 0
+
+        def upgrade(conn, version):
+            nonlocal imported
+            if version == 0 and legacy_csv and os.path.exists(legacy_csv):
+                with open(legacy_csv, "r", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        self._insert(conn, row["date"], row["category"], row["amount"])
+                        imported += 1
+            elif version == 1:
+                self._rebuild_rollups(conn)
+
+        try:
+            self.migrate(SCHEMA_VERSION, upgrade)
+        except BaseException:
+            self._reload_categories()
+            raise
+        if imported:
+            logger.info("Imported %d transactions from %s into %s", imported, legacy_csv, self.path)
+
+    # ---- Rollups ----
+    ROLLUP_QUERY = (
+        "SELECT substr(day, 1, 7) AS month, category_id, SUM(amount), COUNT(*), MIN(amount), MAX(amount) "
+        "FROM transactions GROUP BY month, category_id"
+    )
+
+    def _rebuild_rollups(self, conn):
+        conn.execute("DELETE FROM rollups")
+        conn.execute("INSERT INTO rollups (month, category_id, total, count, min_amount, max_amount) " + self.ROLLUP_QUERY)
+
+    def rebuild_rollups(self):
+        with self.write() as conn:
+            self._rebuild_rollups(conn)
+
+    def check_rollups(self, rel_tol=1e-9):
+        # Materialized rollups vs a full recompute from transactions; returns the mismatching cells
+        conn = self._conn()
+        conn.execute("BEGIN")  # one snapshot for both reads
+        try:
+            stored = {
+                (row[0], row[1]): row[2:]
+                for row in conn.execute("SELECT month, category_id, " + ", ".join(ROLLUP_FIELDS) + " FROM rollups")
+            }
+            expected = {(row[0], row[1]): row[2:] for row in conn.execute(self.ROLLUP_QUERY)}
+        finally:
+            conn.execute("COMMIT")
+        mismatches = []
+        for key in stored.keys() | expected.keys():
+            a, b = stored.get(key), expected.get(key)
+            if a is None or b is None:
+                mismatches.append({"month": key[0], "category_id": key[1], "stored": a, "expected": b})
+                continue
+            for field, x, y in zip(ROLLUP_FIELDS, a, b):
+                if abs(x - y) > rel_tol * max(abs(x), abs(y), 1.0):
+                    mismatches.append({"month": key[0], "category_id": key[1], "field": field, "stored": x, "expected": y})
+        return mismatches
+
+    def rollups(self, start_month=None, end_month=None):
+        # Per month x category aggregates for months in [start_month, end_month] ("YYYY-MM", either optional)
+        where, params = [], []
+        if start_month is not None:
+            where.append("month >= ?")
+            params.append(start_month)
+        if end_month is not None:
+            where.append("month <= ?")
+            params.append(end_month)
+        sql = "SELECT month, category_id, " + ", ".join(ROLLUP_FIELDS) + " FROM rollups"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self._conn().execute(sql + " ORDER BY month, category_id", params).fetchall()
+        months, category_ids, *values = zip(*rows) if rows else ((),) * (2 + len(ROLLUP_FIELDS))
+        df = pd.DataFrame({"month": pd.Series(months, dtype=object)})
+        df["category"] = self._categorical(np.asarray(category_ids, dtype=np.int64))
+        for field, column in zip(ROLLUP_FIELDS, values):
+            df[field] = np.asarray(column, dtype=np.int64 if field == "count" else np.float64)
+        return df
+
+    def category_totals(self, start_month=None, end_month=None):
+        # Total spent per category over a month range
+        return self.rollups(start_month, end_month).groupby("category", observed=True)["total"].sum()
+
+    def months(self):
+        return [row[0] for row in self._conn().execute("SELECT DISTINCT month FROM rollups ORDER BY month")]
+
+    def append(self, day, category, amount):
+        try:
+            with self.write() as conn:
+                self._insert(conn, day, category, amount)
+        except BaseException:
+            self._reload_categories()
+            raise
+
+    def read(self, start=None, end=None):
+        # Transactions with start <= date <= end (either bound optional), oldest first
+        where, params = [], []
+        if start is not None:
+            where.append("day >= ?")
+            params.append(pd.Timestamp(start).date().isoformat())
+        if end is not None:
+            where.append("day <= ?")
+            params.append(pd.Timestamp(end).date().isoformat())
+        sql = "SELECT day, category_id, amount FROM transactions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self._conn().execute(sql + " ORDER BY day, id", params).fetchall()
+        days, category_ids, amounts = zip(*rows) if rows else ((), (), ())
+        return pd.DataFrame({
+            "date": pd.to_datetime(pd.Series(days, dtype=object)),
+            "category": self._categorical(np.asarray(category_ids, dtype=np.int64)),
+            "amount": np.asarray(amounts, dtype=np.float64)
+        })
+
+    def _categorical(self, category_ids):
+        # Codes are mapped straight onto the dictionary; category names are never materialized per row
+        with self.lock:
+            if len(category_ids) and not np.isin(category_ids, list(self.category_ids.values())).all():
+                # Another process added a category since this one last looked
+                self.category_ids = dict(self._conn().execute("SELECT name, id FROM categories").fetchall())
+            names = sorted(self.category_ids, key=self.category_ids.get)
+            ids = np.asarray([self.category_ids[n] for n in names], dtype=np.int64)
+        codes = np.searchsorted(ids, category_ids) if len(ids) else np.zeros(0, dtype=np.int64)
+        return pd.Categorical.from_codes(codes, categories=names)
+
+    def date_range(self):
+        first, last = self._conn().execute("SELECT MIN(day), MAX(day) FROM transactions").fetchone()
+        if first is None:
+            return None
+        return date.fromisoformat(first), date.fromisoformat(last)
+
+    def categories(self):
+        with self.lock:
+            return list(self.category_ids)
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Check (or rebuild) the monthly rollups against the transactions.")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    store = TransactionStore(args.db)
+    if args.rebuild:
+        store.rebuild_rollups()
+    mismatches = store.check_rollups()
+    for m in mismatches:
+        print(m)
+    print(f"{len(store)} transactions, {len(store.months())} months: "
+          f"{'rollups consistent' if not mismatches else f'{len(mismatches)} mismatching rollup cells'}")
+    raise SystemExit(1 if mismatches else 0)